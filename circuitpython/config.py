@@ -4,6 +4,11 @@ ItsyBitsy M4 + RockBlock 9602 + DS3231 RTC + TPL5110
 """
 
 import board
+from micropython import const
+
+# Integer settings are wrapped in const() so the compiler can fold them into
+# bytecode. Floats can't be const(); internal-only constants should use a
+# leading underscore (e.g. _FOO = const(1)) so they are inlined completely.
 
 # Hardware Pin Assignments
 PRESSURE_SENSOR_PIN = board.A0      # Analog pin for pressure sensor
@@ -22,21 +27,39 @@ I2C_SCL = board.SCL
 SPI_MOSI = board.MOSI
 SPI_MISO = board.MISO
 SPI_SCK = board.SCK
+SD_BAUDRATE = const(24_000_000)     # SD card SPI clock (drop to 12 MHz if the card is flaky)
 
 # Timing Configuration
 TRANSMISSION_TIMES = [
     (5, 0),   # 5:00 AM
     (13, 0),  # 1:00 PM (13:00 in 24h format)
 ]
+TRANSMISSION_TOLERANCE_MINUTES = const(5)  # Window either side of each time
+
+# Precomputed minute-of-day lookup (0-1439) so the per-wake check is a set test
+TRANSMISSION_WINDOW = frozenset(
+    (h * 60 + m + offset) % 1440
+    for h, m in TRANSMISSION_TIMES
+    for offset in range(-TRANSMISSION_TOLERANCE_MINUTES, TRANSMISSION_TOLERANCE_MINUTES + 1)
+)
+
+# "HH:MM" state key for each transmission time, built once instead of per lookup
+SLOT_STRINGS = {(h, m): f"{h:02d}:{m:02d}" for h, m in TRANSMISSION_TIMES}
+
+# Idle fast path: wakes outside the transmission window with no pending retries
+# read only the RTC and go straight back to sleep, skipping the sensor and SD
+# card. Those idle readings are NOT logged, so this is off by default.
+IDLE_FAST_PATH = False
+PENDING_FLAG_NVM_INDEX = const(0)  # microcontroller.nvm byte: retries pending
 
 # Timezone offset from UTC (will need to handle PST/PDT)
 # PST = UTC-8, PDT = UTC-7
-TIMEZONE_OFFSET_PST = -8
-TIMEZONE_OFFSET_PDT = -7
+TIMEZONE_OFFSET_PST = const(-8)
+TIMEZONE_OFFSET_PDT = const(-7)
 
 # Sensor Configuration
 PRESSURE_SENSOR_VREF = 3.3          # Reference voltage
-PRESSURE_SENSOR_RESOLUTION = 4096   # 12-bit ADC (2^12)
+PRESSURE_SENSOR_RESOLUTION = const(4096)  # 12-bit ADC (2^12)
 PRESSURE_SENSOR_MIN_PRESSURE = 0.0  # Min pressure (psi or kPa)
 PRESSURE_SENSOR_MAX_PRESSURE = 30.0 # Max pressure (adjust based on sensor)
 
@@ -46,22 +69,50 @@ ATMOSPHERIC_PRESSURE = 14.7  # psi at sea level
 WATER_DENSITY_FACTOR = 0.433 # psi per foot of water
 
 # Communication Configuration
-ROCKBLOCK_BAUD_RATE = 19200
-TRANSMISSION_TIMEOUT = 300   # 5 minutes max for transmission
-MAX_RETRY_ATTEMPTS = 3
-RETRY_BACKOFF_MINUTES = [5, 15, 30]  # Progressive backoff
+ROCKBLOCK_BAUD_RATE = const(19200)
+TRANSMISSION_TIMEOUT = const(300)  # 5 minutes max for transmission
+MAX_RETRY_ATTEMPTS = const(3)
+# Retry backoff: min(RETRY_MAX_DELAY_S, RETRY_BASE_S * RETRY_EXP_BASE**attempt),
+# jittered by +/- RETRY_JITTER/2 and cut short once signal recovers
+RETRY_BASE_S = const(300)           # First backoff, 5 minutes
+RETRY_EXP_BASE = 1.3                # Growth per attempt
+RETRY_JITTER = 0.5                  # Total jitter span as a fraction of delay
+RETRY_MAX_DELAY_S = const(1800)     # Cap at 30 minutes
+RETRY_POLL_S = const(5)             # Signal check interval while waiting
+RETRY_GOOD_SIGNAL = const(3)        # Signal bars that end the wait early
+NO_SIGNAL_PROBES = const(3)         # Probes (RETRY_POLL_S apart) before giving up on no signal
 
 # File paths on SD card
-STATE_FILE = "/sd/state.json"
+STATE_FILE = "/sd/state.txt"
+LEGACY_STATE_FILE = "/sd/state.json"  # Read once if STATE_FILE doesn't exist yet
+STATE_BACKUP_FILE = "/sd/backup/state_backup.txt"
 LOG_FILE = "/sd/water_log.csv"
+BIN_LOG_FILE = "/sd/water_log.bin"
 ERROR_LOG = "/sd/errors.log"
 
 # Message format for satellite transmission
-MESSAGE_FORMAT = "WD:{timestamp},{depth_ft:.2f},{pressure_raw},{battery_v:.2f}"
+# Positional fields: timestamp, depth_ft, pressure_raw, battery_v
+MESSAGE_FORMAT = "WD:%s,%.2f,%d,%.2f"
+
+# Compact binary messages (10 bytes instead of ~35 ASCII, fewer Iridium credits)
+# Fields: UTC epoch seconds, depth in 0.01 ft, raw ADC, battery in 0.01 V
+COMPACT_MESSAGES = False
+BIN_FORMAT = "<IHHH"
+
+# Log readings as fixed 50-byte binary records in BIN_LOG_FILE instead of CSV
+# Fields: UTC epoch seconds, depth_ft, raw ADC, battery_v, tx success, tx attempts,
+# signal quality, error (first 32 bytes) - decode with tools/decode_binary_log.py
+BINARY_LOG = False
+BIN_LOG_RECORD = "<IfHfBBh32s"
 
 # Power management
 LOW_BATTERY_THRESHOLD = 3.2  # Volts
 BATTERY_MONITOR_PIN = board.VOLTAGE_MONITOR  # Built-in battery monitoring
 
 # Debug mode (set to False for production)
-DEBUG_MODE = True
\ No newline at end of file
+DEBUG_MODE = True
+
+def debug_print(*args):
+    """Print informational output only when DEBUG_MODE is enabled"""
+    if DEBUG_MODE:
+        print(*args)
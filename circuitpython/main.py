@@ -9,30 +9,79 @@ at scheduled intervals (5AM and 1PM PST/PDT).
 import time
 import busio
 import digitalio
+import microcontroller
+from micropython import const
 from config import *
 from sensor import PressureSensor
-from time_manager import TimeManager
-from satellite import SatelliteModem
-from storage_manager import StorageManager
 from power_manager import PowerManager
 
+# Debug guard for this module; messages pass print() separate args, so
+# nothing is formatted unless debugging
+_DBG = DEBUG_MODE
+
+# Subsystem modules loaded on first use - many wake cycles never need them
+_mods = {}
+
+def _get(name):
+    """Import a subsystem module on first use and cache it"""
+    mod = _mods.get(name)
+    if mod is None:
+        mod = _mods[name] = __import__(name)
+    return mod
+
+# Capability bits set as each subsystem comes up this wake
+_CAP_POWER = const(1)
+_CAP_STORAGE = const(2)
+
 # Global status LED for visual feedback
 status_led = digitalio.DigitalInOut(STATUS_LED_PIN)
 status_led.direction = digitalio.Direction.OUTPUT
 
 def blink_status_led(count=1, duration=0.2):
-    """Blink status LED for visual feedback"""
+    """Blink status LED for visual feedback (DEBUG_MODE only - blinking keeps the CPU awake)"""
+    if not _DBG:
+        return
+        
     for _ in range(count):
         status_led.value = True
         time.sleep(duration)
         status_led.value = False
         time.sleep(duration)
 
+def retries_pending():
+    """Check the non-volatile flag set when failed transmissions await retry"""
+    # Erased flash reads 0xFF, so an unset flag counts as pending
+    return microcontroller.nvm[PENDING_FLAG_NVM_INDEX] != 0
+
+def set_retries_pending(pending):
+    """Update the pending-retries flag, writing flash only when it changes"""
+    value = 1 if pending else 0
+    if microcontroller.nvm[PENDING_FLAG_NVM_INDEX] != value:
+        microcontroller.nvm[PENDING_FLAG_NVM_INDEX] = value
+
+def fast_idle_check():
+    """
+    Specialized check for the common "nothing to do" wake
+    Returns True if the wake is outside every transmission window and no
+    retries are pending, so the sensor and SD card can be skipped entirely
+    """
+    if not IDLE_FAST_PATH or retries_pending():
+        return False
+        
+    i2c = busio.I2C(I2C_SCL, I2C_SDA)
+    time_mgr = _get("time_manager").TimeManager(i2c)
+    try:
+        return time_mgr.minute_of_day() not in TRANSMISSION_WINDOW
+    finally:
+        # Release the bus so the full wake cycle can reclaim the pins
+        time_mgr.deinit()
+        i2c.deinit()
+
 def main():
     """Main application logic"""
-    print("\n" + "="*50)
-    print("Water Depth Monitor Starting")
-    print("="*50)
+    debug_print("\n" + "="*50)
+    debug_print("Water Depth Monitor Starting")
+    debug_print("="*50)
     
     # Initialize components
     power_mgr = None
@@ -40,6 +89,7 @@ def main():
     time_mgr = None
     sensor = None
     satellite = None
+    caps = 0
     
     try:
         # Blink LED to indicate startup
@@ -47,11 +97,13 @@ def main():
         
         # Initialize power management first
         power_mgr = PowerManager()
-        print("Power management initialized")
+        caps |= _CAP_POWER
+        debug_print("Power management initialized")
         
         # Check battery status immediately
         battery_status = power_mgr.check_battery_status()
-        print(f"Battery: {battery_status['voltage']:.2f}V ({battery_status['percentage']}%)")
+        if _DBG:
+            print(f"Battery: {battery_status['voltage']:.2f}V ({battery_status['percentage']}%)")
         
         # Handle emergency low battery
         if battery_status["recommendation"] == "emergency_shutdown":
@@ -59,62 +111,82 @@ def main():
             power_mgr.handle_emergency_shutdown(None, "Critical low battery detected")
             return  # This line may never execute if TPL5110 cuts power
             
+        # Idle wake - go straight back to sleep
+        if fast_idle_check():
+            debug_print("Idle wake - outside transmission window, nothing pending")
+            return
+            
         # Initialize storage management
-        storage_mgr = StorageManager()
+        storage_mgr = _get("storage_manager").StorageManager()
         if not storage_mgr.initialize():
             print("WARNING: SD card not available - running without persistence")
         else:
-            print("Storage initialized")
+            caps |= _CAP_STORAGE
+            debug_print("Storage initialized")
             
         # Load system state
-        state = storage_mgr.load_state() if storage_mgr.is_mounted else {}
+        state = storage_mgr.load_state() if caps & _CAP_STORAGE else {}
         state["total_wake_cycles"] = state.get("total_wake_cycles", 0) + 1
         state["last_wake_time"] = time.monotonic()
         
-        print(f"Wake cycle #{state['total_wake_cycles']}")
+        debug_print("Wake cycle", state["total_wake_cycles"])
         
         # Initialize time management
         i2c = busio.I2C(I2C_SCL, I2C_SDA)
-        time_mgr = TimeManager(i2c)
-        time_info = time_mgr.get_system_info()
-        print(f"Current time: {time_info['pacific_time']}")
+        time_mgr = _get("time_manager").TimeManager(i2c)
+        
+        # Read the RTC once; everything time-related this wake uses the snapshot
+        snap = time_mgr.snapshot()
+        debug_print("Current time:", snap["pacific_time"])
+        log_epoch = time.mktime(snap["utc"]) if BINARY_LOG else 0
         
         # Initialize sensor
         sensor = PressureSensor()
-        print("Pressure sensor initialized")
+        debug_print("Pressure sensor initialized")
+        
+        # Take the single sensor reading for this wake cycle
+        sensor_data = sensor.get_sensor_diagnostics()
+        sensor_data["battery_voltage"] = battery_status["voltage"]
         
         # Check if it's transmission time or if we have pending retries
-        is_tx_time, tx_slot = time_mgr.is_transmission_time(tolerance_minutes=5)
-        pending_transmissions = storage_mgr.get_pending_transmissions(state, time_mgr) if storage_mgr.is_mounted else []
+        is_tx_time, tx_slot = snap["is_transmission_time"], snap["next_transmission"]
+        pending_transmissions = storage_mgr.get_pending_transmissions(state, time_mgr) if caps & _CAP_STORAGE else []
         
         should_transmit = is_tx_time or len(pending_transmissions) > 0
         
         if should_transmit:
-            print(f"Transmission needed - Time slot: {tx_slot}, Pending: {len(pending_transmissions)}")
+            debug_print("Transmission needed - Time slot:", tx_slot, "Pending:", len(pending_transmissions))
             
             # Check if we should skip transmission due to low battery
             skip_tx, skip_reason = power_mgr.should_skip_transmission(battery_status)
             if skip_tx:
-                print(f"Skipping transmission: {skip_reason}")
-                if storage_mgr.is_mounted:
+                debug_print("Skipping transmission:", skip_reason)
+                if caps & _CAP_STORAGE:
                     storage_mgr.log_error(f"Transmission skipped: {skip_reason}", "POWER")
             else:
                 # Perform transmission
-                transmission_result = perform_transmission(sensor, time_mgr, satellite, state)
+                transmission_result = perform_transmission(
+                    sensor, time_mgr, satellite, state,
+                    precomputed_reading=sensor_data, snapshot=snap
+                )
+                state["sat_fail_streak"] = transmission_result.get(
+                    "fail_streak", state.get("sat_fail_streak", 0)
+                )
                 
                 # Log results
-                if storage_mgr.is_mounted:
-                    sensor_data = sensor.get_sensor_diagnostics()
-                    sensor_data["battery_voltage"] = battery_status["voltage"]
+                if caps & _CAP_STORAGE:
                     storage_mgr.log_sensor_reading(
-                        time_mgr.get_timestamp_string(),
+                        snap["timestamp"],
                         sensor_data,
-                        transmission_result
+                        transmission_result,
+                        utc_epoch=log_epoch
                     )
                     
-                    # Update state with transmission result
-                    if tx_slot:
-                        time_slot_str = f"{tx_slot[0]:02d}:{tx_slot[1]:02d}"
+                    # Update state with transmission result; a cycle skipped by
+                    # the fail-streak backoff never tried, so it must not push
+                    # real failures out of the slot's MAX_FAILED_PER_SLOT history
+                    if tx_slot and transmission_result.get("error") != "skipped-backoff":
+                        time_slot_str = SLOT_STRINGS[tx_slot]
                         storage_mgr.record_transmission_attempt(
                             state, 
                             time_slot_str, 
@@ -123,43 +195,48 @@ def main():
                         )
                         
         else:
-            print("No transmission needed")
-            next_tx_minutes = time_mgr.minutes_until_next_transmission()
-            print(f"Next transmission in {next_tx_minutes} minutes")
+            debug_print("No transmission needed")
+            debug_print("Next transmission in", snap["minutes_until_next"], "minutes")
             
-            # Still take a sensor reading for logging
-            sensor_data = sensor.get_sensor_diagnostics()
-            sensor_data["battery_voltage"] = battery_status["voltage"]
-            print(f"Current depth: {sensor_data['depth_feet']:.2f} feet")
+            # Still log the sensor reading
+            if _DBG:
+                print(f"Current depth: {sensor_data['depth_feet']:.2f} feet")
             
-            if storage_mgr.is_mounted:
+            if caps & _CAP_STORAGE:
                 storage_mgr.log_sensor_reading(
-                    time_mgr.get_timestamp_string(),
-                    sensor_data
+                    snap["timestamp"],
+                    sensor_data,
+                    utc_epoch=log_epoch
                 )
         
         # Save updated state
-        if storage_mgr.is_mounted:
+        if caps & _CAP_STORAGE:
             storage_mgr.save_state(state)
+            set_retries_pending(state.get("failed_attempts"))
             
         # Print system diagnostics
-        print_system_diagnostics(power_mgr, storage_mgr, time_mgr, sensor, satellite)
+        print_system_diagnostics(power_mgr, storage_mgr, time_mgr, sensor, satellite, snap)
         
     except Exception as e:
         print(f"SYSTEM ERROR: {e}")
         blink_status_led(10, 0.1)  # Rapid blinking for error
+        status_led.value = True  # Stays lit until TPL5110 cuts power
         
         # Log error if possible
-        if storage_mgr and storage_mgr.is_mounted:
+        if caps & _CAP_STORAGE:
             storage_mgr.log_error(f"System error in main: {str(e)}", "SYSTEM")
             
     finally:
         # Clean up and prepare for sleep
-        print("\nPreparing for sleep...")
+        debug_print("\nPreparing for sleep...")
         
-        if power_mgr:
+        if caps & _CAP_POWER:
             preparations = power_mgr.prepare_for_sleep()
             
+        # Write any buffered log lines before the SD card is unmounted
+        if caps & _CAP_STORAGE:
+            storage_mgr.flush()
+            
         # Clean up resources
         cleanup_resources(power_mgr, storage_mgr, time_mgr, sensor, satellite)
         
@@ -167,42 +244,56 @@ def main():
         blink_status_led(2, 0.5)
         
         # Signal TPL5110 that we're done
-        if power_mgr:
+        if caps & _CAP_POWER:
             power_mgr.signal_done()
         
-        print("System should power down now...")
+        debug_print("System should power down now...")
         time.sleep(2)  # Give time for power down
         
         # If we reach here, TPL5110 didn't cut power
         print("WARNING: System did not power down as expected!")
 
-def perform_transmission(sensor, time_mgr, satellite, state):
-    """Perform satellite transmission with sensor data"""
-    print("Starting satellite transmission...")
+def perform_transmission(sensor, time_mgr, satellite, state, precomputed_reading=None, snapshot=None):
+    """
+    Perform satellite transmission with sensor data
+    precomputed_reading: Sensor diagnostics already taken this wake (read now if None)
+    snapshot: TimeManager.snapshot() taken this wake (RTC read now if None)
+    """
+    debug_print("Starting satellite transmission...")
     
     try:
-        # Initialize satellite modem if not already done
-        if not satellite:
-            satellite = SatelliteModem()
-            
-        if not satellite.initialize():
+        # Skip-cycle backoff: while the modem keeps failing, only power it
+        # up on every Nth wake cycle
+        sat_mod = _get("satellite")
+        fail_streak = state.get("sat_fail_streak", 0)
+        if sat_mod.should_skip_cycle(fail_streak, state.get("total_wake_cycles", 0)):
+            debug_print("Skipping satellite this cycle,", fail_streak, "consecutive failures")
             return {
                 "success": False,
                 "attempts": 0,
-                "error": "Failed to initialize satellite modem",
-                "signal_quality": -1
+                "error": "skipped-backoff",
+                "signal_quality": -1,
+                "fail_streak": fail_streak
             }
             
-        # Take sensor reading
-        print("Taking sensor reading...")
-        sensor_data = sensor.get_sensor_diagnostics()
-        print(f"Depth reading: {sensor_data['depth_feet']:.2f} feet")
+        # Create the modem if not already done; send_message() initializes
+        # it and counts an init failure toward the fail streak
+        if not satellite:
+            satellite = sat_mod.SatelliteModem(state)
+            
+        # Take sensor reading unless the caller already has one
+        sensor_data = precomputed_reading
+        if sensor_data is None:
+            debug_print("Taking sensor reading...")
+            sensor_data = sensor.get_sensor_diagnostics()
+        if _DBG:
+            print(f"Depth reading: {sensor_data['depth_feet']:.2f} feet")
         
         # Send data
-        result = satellite.send_data_reading(sensor_data, time_mgr)
+        result = satellite.send_data_reading(sensor_data, time_mgr, snapshot)
         
         if result["success"]:
-            print(f"✓ Transmission successful (attempt {result['attempts']})")
+            debug_print("✓ Transmission successful, attempt", result["attempts"])
             blink_status_led(5, 0.1)  # Success pattern
         else:
             print(f"✗ Transmission failed after {result['attempts']} attempts")
@@ -218,22 +309,26 @@ def perform_transmission(sensor, time_mgr, satellite, state):
             "success": False,
             "attempts": 0,
             "error": error_msg,
-            "signal_quality": -1
+            "signal_quality": -1,
+            "fail_streak": state.get("sat_fail_streak", 0) + 1
         }
     finally:
         # Put satellite to sleep to save power
         if satellite:
             satellite.sleep()
 
-def print_system_diagnostics(power_mgr, storage_mgr, time_mgr, sensor, satellite):
+def print_system_diagnostics(power_mgr, storage_mgr, time_mgr, sensor, satellite, snapshot=None):
     """Print comprehensive system diagnostics"""
+    if not _DBG:
+        return
+        
     print("\n" + "-"*30)
     print("SYSTEM DIAGNOSTICS")
     print("-"*30)
     
     try:
-        if power_mgr:
-            power_diag = power_mgr.get_power_diagnostics()
+        power_diag = power_mgr.get_power_diagnostics() if power_mgr else None
+        if power_diag:
             print(f"Power: {power_diag['battery_voltage']:.2f}V ({power_diag['battery_percentage']}%)")
             print(f"Wake duration: {power_diag['wake_duration_seconds']:.1f}s")
             
@@ -245,7 +340,7 @@ def print_system_diagnostics(power_mgr, storage_mgr, time_mgr, sensor, satellite
                 print("Storage: Not available")
                 
         if time_mgr:
-            time_info = time_mgr.get_system_info()
+            time_info = snapshot if snapshot else time_mgr.get_system_info()
             print(f"Time: {time_info['pacific_time']}")
             print(f"Next TX: {time_info['minutes_until_next']} minutes")
             
@@ -263,9 +358,9 @@ def print_system_diagnostics(power_mgr, storage_mgr, time_mgr, sensor, satellite
     print("-"*30)
 
 def cleanup_resources(*managers):
-    """Clean up all system resources"""
+    """Clean up all system resources (every manager class defines deinit)"""
     for manager in managers:
-        if manager and hasattr(manager, 'deinit'):
+        if manager is not None:
             try:
                 manager.deinit()
             except:
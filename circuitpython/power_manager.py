@@ -6,82 +6,105 @@ Handles system power cycling and low battery protection
 import time
 import analogio
 import digitalio
+from array import array
+from micropython import const
 from config import *
 
+# Debug guard for this module; messages pass print() separate args, so
+# nothing is formatted unless debugging
+_DBG = DEBUG_MODE
+
+# Battery ADC is averaged over this many samples (power of two for the shift)
+BATTERY_SAMPLE_SHIFT = const(4)
+BATTERY_SAMPLES = const(1 << BATTERY_SAMPLE_SHIFT)
+
+# Busy-loop iterations for the TPL5110 done pulse
+TPL5110_DONE_PULSE_LOOPS = const(100)
+
+# Battery status is reused for this long within a wake cycle
+BATTERY_STATUS_CACHE_SECONDS = const(30)
+
+# Raw 16-bit ADC to volts, including the 2:1 divider on the battery line
+# If using a different divider, adjust the multiplier here
+_BATT_SCALE = (PRESSURE_SENSOR_VREF * 2.0) / 65535.0
+
+# LiPo percentage by centivolt, 3.00V (empty) to 4.20V (full)
+# Simple linear approximation - adjust range for your specific battery
+BATTERY_EMPTY_CV = const(300)
+BATTERY_FULL_CV = const(420)
+_PCT_TABLE = tuple(
+    (cv - BATTERY_EMPTY_CV) * 100 // (BATTERY_FULL_CV - BATTERY_EMPTY_CV)
+    for cv in range(BATTERY_EMPTY_CV, BATTERY_FULL_CV + 1)
+)
+
 class PowerManager:
     def __init__(self):
         """Initialize power management"""
         # Setup TPL5110 done signal pin
         self.done_pin = digitalio.DigitalInOut(TPL5110_DONE_PIN)
-        self.done_pin.direction = digitalio.Direction.OUTPUT
-        self.done_pin.value = False  # Start low
+        self.done_pin.switch_to_output(value=False)  # Start low, single pin write
         
         # Setup battery monitoring (if available)
         self.battery_monitor = None
+        self._battery_samples = array('H', [0] * BATTERY_SAMPLES)
         try:
             self.battery_monitor = analogio.AnalogIn(BATTERY_MONITOR_PIN)
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Battery monitoring not available: {e}")
+            debug_print("Battery monitoring not available:", e)
         
         # Power management state
         self.wake_start_time = time.monotonic()
         self.max_wake_duration = 300  # 5 minutes max wake time
         self.battery_voltage = 0.0
         self.is_low_battery = False
+        self._battery_status_cache = None
+        self._battery_status_ts = 0
         
     def signal_done(self):
         """Signal TPL5110 that we're done and ready to sleep"""
+        if _DBG:
+            wake_duration = time.monotonic() - self.wake_start_time
+            print(f"Signaling TPL5110 done (awake for {wake_duration:.1f}s)")
+        
+        # Pulse the done pin high - TPL5110 only needs ~100ns, this
+        # busy loop gives tens of microseconds at 120MHz
         try:
-            if DEBUG_MODE:
-                wake_duration = time.monotonic() - self.wake_start_time
-                print(f"Signaling TPL5110 done (awake for {wake_duration:.1f}s)")
-            
-            # Pulse the done pin high briefly
             self.done_pin.value = True
-            time.sleep(0.1)  # 100ms pulse
-            self.done_pin.value = False
-            
-            # Give TPL5110 time to cut power
-            time.sleep(1)
-            
-            # If we get here, TPL5110 didn't cut power - something's wrong
-            if DEBUG_MODE:
-                print("WARNING: TPL5110 did not cut power as expected")
-                
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error signaling TPL5110: {e}")
+            debug_print("Error signaling TPL5110:", e)
+            return
+        for _ in range(TPL5110_DONE_PULSE_LOOPS):
+            pass
+        self.done_pin.value = False
+        # Power is cut shortly after; callers report if it never happens
                 
     def read_battery_voltage(self):
-        """Read current battery voltage"""
+        """Read current battery voltage (ADC errors propagate to the caller)"""
         if not self.battery_monitor:
             return 0.0
             
-        try:
-            # Read raw ADC value
-            raw_value = self.battery_monitor.value
-            
-            # Convert to voltage (assuming voltage divider or direct measurement)
-            # This may need adjustment based on your specific battery monitoring circuit
-            voltage = (raw_value / 65535.0) * PRESSURE_SENSOR_VREF
-            
-            # If using a voltage divider, multiply by the divider ratio
-            # For example, if using a 2:1 divider for a 3.7V LiPo:
-            voltage = voltage * 2.0  # Adjust this multiplier as needed
-            
-            self.battery_voltage = voltage
-            self.is_low_battery = voltage < LOW_BATTERY_THRESHOLD
-            
-            return voltage
-            
-        except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error reading battery voltage: {e}")
-            return 0.0
+        # Average several raw ADC samples to smooth out LiPo line noise
+        samples = self._battery_samples
+        for i in range(BATTERY_SAMPLES):
+            samples[i] = self.battery_monitor.value
+        raw_value = sum(samples) >> BATTERY_SAMPLE_SHIFT
+        
+        # Convert to voltage (assuming voltage divider or direct measurement)
+        # This may need adjustment based on your specific battery monitoring circuit
+        voltage = raw_value * _BATT_SCALE
+        
+        self.battery_voltage = voltage
+        self.is_low_battery = voltage < LOW_BATTERY_THRESHOLD
+        
+        return voltage
             
     def check_battery_status(self):
-        """Check battery status and return recommendations"""
+        """Check battery status and return recommendations (memoized within a wake)"""
+        now = time.monotonic()
+        if (self._battery_status_cache is not None and
+                now - self._battery_status_ts < BATTERY_STATUS_CACHE_SECONDS):
+            return self._battery_status_cache
+            
         voltage = self.read_battery_voltage()
         
         status = {
@@ -99,25 +122,22 @@ class PowerManager:
             else:
                 status["recommendation"] = "monitor_closely"
                 
+        self._battery_status_cache = status
+        self._battery_status_ts = now
         return status
         
+    def invalidate_battery_status(self):
+        """Force the next check_battery_status() to re-read the ADC"""
+        self._battery_status_cache = None
+        
     def _estimate_battery_percentage(self, voltage):
         """Estimate battery percentage from voltage (rough approximation)"""
-        if voltage <= 0:
+        cv = int(voltage * 100)
+        if cv <= BATTERY_EMPTY_CV:
             return 0
-            
-        # Simple linear approximation for Li-Ion/LiPo battery
-        # These values may need adjustment based on your specific battery
-        voltage_min = 3.0  # Empty voltage
-        voltage_max = 4.2  # Full voltage
-        
-        if voltage >= voltage_max:
+        if cv >= BATTERY_FULL_CV:
             return 100
-        elif voltage <= voltage_min:
-            return 0
-        else:
-            percentage = ((voltage - voltage_min) / (voltage_max - voltage_min)) * 100
-            return max(0, min(100, int(percentage)))
+        return _PCT_TABLE[cv - BATTERY_EMPTY_CV]
             
     def should_skip_transmission(self, battery_status):
         """Determine if transmission should be skipped due to power constraints"""
@@ -155,22 +175,21 @@ class PowerManager:
             wake_duration = self.get_wake_duration()
             preparations.append(f"Wake duration: {wake_duration:.1f}s")
             
-            if DEBUG_MODE:
+            if _DBG:
                 print("Preparing for sleep:")
                 for prep in preparations:
                     print(f"  - {prep}")
                     
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error preparing for sleep: {e}")
+            debug_print("Error preparing for sleep:", e)
                 
+        self.invalidate_battery_status()
         return preparations
         
     def handle_emergency_shutdown(self, storage_manager, error_message):
         """Handle emergency shutdown due to critical low battery"""
         try:
-            if DEBUG_MODE:
-                print(f"EMERGENCY SHUTDOWN: {error_message}")
+            debug_print("EMERGENCY SHUTDOWN:", error_message)
             
             # Log emergency shutdown
             if storage_manager:
@@ -178,13 +197,13 @@ class PowerManager:
                     f"Emergency shutdown: {error_message}", 
                     "POWER_CRITICAL"
                 )
+                storage_manager.flush()  # Power is cut right after signal_done
                 
             # Signal done immediately
             self.signal_done()
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error during emergency shutdown: {e}")
+            debug_print("Error during emergency shutdown:", e)
             # Still try to signal done
             try:
                 self.signal_done()
@@ -192,7 +211,10 @@ class PowerManager:
                 pass
                 
     def get_power_diagnostics(self):
-        """Get power system diagnostic information"""
+        """Get power system diagnostic information (None unless DEBUG_MODE)"""
+        if not _DBG:
+            return None
+            
         battery_status = self.check_battery_status()
         wake_duration = self.get_wake_duration()
         force_sleep, force_reason = self.should_force_sleep()
@@ -222,12 +244,10 @@ class PowerManager:
             # Disable unnecessary peripherals
             # This would be implementation-specific
             
-            if DEBUG_MODE:
-                print("Power optimization applied")
+            debug_print("Power optimization applied")
                 
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error optimizing power: {e}")
+            debug_print("Error optimizing power:", e)
                 
     def deinit(self):
         """Clean up power management resources"""
@@ -4,14 +4,48 @@ Handles message transmission with retry logic and error recovery
 """
 
 import time
+import struct
+import random
 import busio
 import digitalio
 import adafruit_rockblock
+from micropython import const
 from config import *
 
+# Debug guard for this module; messages pass print() separate args, so
+# nothing is formatted unless debugging
+_DBG = DEBUG_MODE
+
+# RockBlock 9602 mobile-originated SBD message limit
+SBD_MO_MAX = const(340)
+
+def _no_debug(*args):
+    """Stand-in for print when DEBUG_MODE is off"""
+    pass
+    
+def skip_multiplier(fail_streak):
+    """Attempt only every Nth wake cycle once the modem keeps failing"""
+    if fail_streak < 3:
+        return 1
+    if fail_streak < 10:
+        return 2
+    if fail_streak < 30:
+        return 4
+    return 8
+    
+def should_skip_cycle(fail_streak, cycle_index):
+    """True if this wake cycle is skipped by the failure-streak backoff"""
+    return cycle_index % skip_multiplier(fail_streak) != 0
+
 class SatelliteModem:
-    def __init__(self):
-        """Initialize RockBlock 9602 modem"""
+    def __init__(self, state=None):
+        """
+        Initialize RockBlock 9602 modem
+        state: persistent system state, seeds the consecutive-failure streak
+        """
+        state = state or {}
+        self._fail_streak = state.get("sat_fail_streak", 0)
+        
         # Setup UART for RockBlock communication
         self.uart = busio.UART(
             ROCKBLOCK_TX_PIN, 
@@ -24,10 +58,24 @@ class SatelliteModem:
         self.sleep_pin = digitalio.DigitalInOut(ROCKBLOCK_SLEEP_PIN)
         self.sleep_pin.direction = digitalio.Direction.OUTPUT
         self.sleep_pin.value = False  # Wake up RockBlock
+        self._sleeping = False  # Mirrors sleep_pin so repeat calls skip the GPIO write
         
         # Initialize RockBlock library
         self.rockblock = None
         self.is_initialized = False
+        self._last_sigq = -1  # Last signal quality read from the modem
+        
+        # Debug output resolved once instead of testing _DBG per call;
+        # callers pass message parts as separate args so nothing is
+        # formatted when it is the no-op
+        self._dbg = print if _DBG else _no_debug
+        
+        # Transmit buffer reused for every send to avoid heap churn
+        self._tx_buf = bytearray(SBD_MO_MAX)
+        self._tx_view = memoryview(self._tx_buf)
+        
+        # Message formatter bound once; MESSAGE_FORMAT uses %-placeholders
+        self._fmt = lambda ts, depth, raw, batt: MESSAGE_FORMAT % (ts, depth, raw, batt)
         
     def initialize(self):
         """Initialize and test RockBlock modem"""
@@ -42,26 +90,29 @@ class SatelliteModem:
             # Test communication
             if self.test_communication():
                 self.is_initialized = True
-                if DEBUG_MODE:
-                    print("RockBlock initialized successfully")
+                self._dbg("RockBlock initialized successfully")
                 return True
             else:
-                if DEBUG_MODE:
-                    print("RockBlock communication test failed")
+                self._dbg("RockBlock communication test failed")
                 return False
                 
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"RockBlock initialization error: {e}")
+            self._dbg("RockBlock initialization error:", e)
             return False
             
     def wake_up(self):
-        """Wake up RockBlock from sleep mode"""
+        """Wake up RockBlock from sleep mode (no-op if already awake)"""
+        if not self._sleeping:
+            return
+        self._sleeping = False
         self.sleep_pin.value = False  # Active low
         time.sleep(1)
         
     def sleep(self):
-        """Put RockBlock into sleep mode to save power"""
+        """Put RockBlock into sleep mode to save power (no-op if already asleep)"""
+        if self._sleeping:
+            return
+        self._sleeping = True
         if self.rockblock:
             try:
                 self.rockblock.sleep()
@@ -77,15 +128,15 @@ class SatelliteModem:
                 
             # Try to get signal quality
             signal_quality = self.rockblock.signal_quality
-            if DEBUG_MODE:
-                print(f"Signal quality: {signal_quality}")
+            # No answer reads as None; report it as -1 like other failures
+            self._last_sigq = signal_quality if signal_quality is not None else -1
+            self._dbg("Signal quality:", signal_quality)
                 
             # Check if we got a valid response
             return signal_quality is not None
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Communication test error: {e}")
+            self._dbg("Communication test error:", e)
             return False
             
     def get_signal_quality(self):
@@ -95,11 +146,11 @@ class SatelliteModem:
                 if not self.initialize():
                     return -1
                     
-            return self.rockblock.signal_quality
+            signal_quality = self.rockblock.signal_quality
+            return signal_quality if signal_quality is not None else -1
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error getting signal quality: {e}")
+            self._dbg("Error getting signal quality:", e)
             return -1
             
     def send_message(self, message, max_attempts=MAX_RETRY_ATTEMPTS):
@@ -110,83 +161,157 @@ class SatelliteModem:
         if not message:
             return False, 0, "Empty message"
             
-        # Ensure message isn't too long (RockBlock has ~340 byte limit)
-        if len(message.encode()) > 340:
-            message = message[:337] + "..."
+        # Stage once into the transmit buffer; every retry sends the same
+        # bytes. Compact messages are already packed there.
+        if isinstance(message, memoryview):
+            payload = message
+        else:
+            payload = self._stage(message.encode() if isinstance(message, str) else message)
+            
+        # Initialize once for the whole send; the retry loop only
+        # re-initializes after an exception clears is_initialized
+        if not self.is_initialized and not self.initialize():
+            self._fail_streak += 1
+            return False, 1, "Failed to initialize RockBlock"
             
         last_error = ""
         
         for attempt in range(max_attempts):
             try:
-                if DEBUG_MODE:
-                    print(f"Transmission attempt {attempt + 1}/{max_attempts}")
-                    print(f"Message: {message}")
-                
-                # Initialize if needed
-                if not self.is_initialized:
-                    if not self.initialize():
-                        last_error = "Failed to initialize RockBlock"
-                        continue
+                self._dbg("Transmission attempt", attempt + 1, "of", max_attempts)
+                self._dbg("Message:", message)
                 
-                # Check signal quality first
-                signal_quality = self.get_signal_quality()
+                # Check signal quality first - the first attempt reuses the
+                # reading initialize() just took, retries poll once more
+                if attempt:
+                    self._last_sigq = self.get_signal_quality()
+                signal_quality = self._last_sigq
                 if signal_quality < 1:
-                    last_error = f"Poor signal quality: {signal_quality}"
-                    if DEBUG_MODE:
-                        print(last_error)
-                    time.sleep(30)  # Wait for better signal
-                    continue
+                    self._dbg("Poor signal quality:", signal_quality)
+                    # A few short probes; if the sky stays dark give up on
+                    # this wake so the TPL5110 can power us down
+                    for _ in range(NO_SIGNAL_PROBES):
+                        time.sleep(RETRY_POLL_S)
+                        signal_quality = self.get_signal_quality()
+                        self._last_sigq = signal_quality
+                        if signal_quality >= 1:
+                            break
+                    else:
+                        self._fail_streak += 1
+                        return False, attempt + 1, "no-signal"
                 
-                if DEBUG_MODE:
-                    print(f"Signal quality: {signal_quality}/5")
+                self._dbg("Signal quality:", signal_quality, "of 5")
                 
                 # Send message
-                success = self.rockblock.text_message(message)
+                success = self._send_payload(payload)
                 
                 if success:
-                    if DEBUG_MODE:
-                        print("Message sent successfully!")
+                    self._dbg("Message sent successfully!")
+                    self._fail_streak = 0
                     return True, attempt + 1, ""
                 else:
                     last_error = "RockBlock reported send failure"
                     
             except Exception as e:
                 last_error = f"Exception during send: {str(e)}"
-                if DEBUG_MODE:
-                    print(last_error)
+                self.is_initialized = False  # Modem state unknown, re-init before next use
+                self._dbg(last_error)
             
-            # Progressive backoff between attempts
+            # Jittered exponential backoff between attempts
             if attempt < max_attempts - 1:
-                backoff_minutes = RETRY_BACKOFF_MINUTES[min(attempt, len(RETRY_BACKOFF_MINUTES) - 1)]
-                if DEBUG_MODE:
-                    print(f"Waiting {backoff_minutes} minutes before retry...")
-                time.sleep(backoff_minutes * 60)
+                self._backoff(attempt)
         
         # All attempts failed
+        self._fail_streak += 1
         return False, max_attempts, last_error
         
+    def _backoff(self, attempt):
+        """
+        Wait before the next retry, returning early if signal recovers
+        attempt: zero-based index of the attempt that just failed
+        """
+        delay = min(RETRY_MAX_DELAY_S, RETRY_BASE_S * (RETRY_EXP_BASE ** attempt))
+        delay *= 1 + random.random() * RETRY_JITTER - RETRY_JITTER / 2
+        if _DBG:
+            print(f"Waiting up to {delay:.0f}s before retry...")
+            
+        for _ in range(int(delay / RETRY_POLL_S)):
+            time.sleep(RETRY_POLL_S)
+            try:
+                if self.rockblock and self.rockblock.signal_quality >= RETRY_GOOD_SIGNAL:
+                    self._dbg("Signal recovered, retrying early")
+                    return
+            except Exception:
+                pass  # Keep waiting; the retry itself reports modem errors
+                
+    def _stage(self, data):
+        """
+        Copy an encoded message into the preallocated transmit buffer
+        data: bytes-like message, truncated with "..." past SBD_MO_MAX bytes
+        Returns: memoryview of the staged bytes
+        """
+        n = len(data)
+        if n > SBD_MO_MAX:
+            n = SBD_MO_MAX
+            self._tx_buf[:n - 3] = memoryview(data)[:n - 3]
+            self._tx_buf[n - 3:n] = b"..."
+        else:
+            self._tx_buf[:n] = data
+        return self._tx_view[:n]
+        
+    def _send_payload(self, payload):
+        """Hand an encoded message to the RockBlock, returns True if sent"""
+        # Text and compact messages both go through the SBD binary write
+        # buffer (data_out, up to SBD_MO_MAX bytes) rather than text_out,
+        # which is limited to 120 characters; the ground station receives
+        # the same bytes either way
+        self.rockblock.data_out = payload
+        status = self.rockblock.satellite_transfer()
+        return status[0] <= 4  # MO status 0-4 means the message was sent
+        
     def format_data_message(self, timestamp, depth_feet, pressure_raw, battery_voltage):
         """Format sensor data into transmission message"""
-        return MESSAGE_FORMAT.format(
-            timestamp=timestamp,
-            depth_ft=depth_feet,
-            pressure_raw=pressure_raw,
-            battery_v=battery_voltage
+        return self._fmt(timestamp, depth_feet, pressure_raw, battery_voltage)
+        
+    def format_binary_message(self, utc_epoch, depth_feet, pressure_raw, battery_voltage):
+        """
+        Pack sensor data into a compact binary message (see BIN_FORMAT)
+        Returns: memoryview into the transmit buffer, valid until the next message
+        """
+        struct.pack_into(
+            BIN_FORMAT,
+            self._tx_buf,
+            0,
+            int(utc_epoch),
+            min(65535, int(depth_feet * 100 + 0.5)),
+            pressure_raw,
+            min(65535, int(battery_voltage * 100 + 0.5))
         )
+        return self._tx_view[:struct.calcsize(BIN_FORMAT)]
         
-    def send_data_reading(self, sensor_data, time_manager):
+    def send_data_reading(self, sensor_data, time_manager, snapshot=None):
         """Send a sensor data reading via satellite"""
         try:
-            # Get timestamp
-            timestamp = time_manager.get_timestamp_string()
+            # Read the RTC unless the caller already has this wake's snapshot
+            if snapshot is None:
+                snapshot = time_manager.snapshot()
+            timestamp = snapshot["timestamp"]
             
             # Format message
-            message = self.format_data_message(
-                timestamp=timestamp,
-                depth_feet=sensor_data["depth_feet"],
-                pressure_raw=sensor_data["raw_adc"],
-                battery_voltage=sensor_data.get("battery_voltage", 0.0)
-            )
+            if COMPACT_MESSAGES:
+                message = self.format_binary_message(
+                    utc_epoch=time.mktime(snapshot["utc"]),
+                    depth_feet=sensor_data["depth_feet"],
+                    pressure_raw=sensor_data["raw_adc"],
+                    battery_voltage=sensor_data.get("battery_voltage", 0.0)
+                )
+            else:
+                message = self.format_data_message(
+                    timestamp=timestamp,
+                    depth_feet=sensor_data["depth_feet"],
+                    pressure_raw=sensor_data["raw_adc"],
+                    battery_voltage=sensor_data.get("battery_voltage", 0.0)
+                )
             
             # Send with retries
             success, attempts, error = self.send_message(message)
@@ -195,9 +320,10 @@ class SatelliteModem:
                 "success": success,
                 "attempts": attempts,
                 "error": error,
-                "message": message,
+                "message": bytes(message) if COMPACT_MESSAGES else message,
                 "timestamp": timestamp,
-                "signal_quality": self.get_signal_quality()
+                "signal_quality": self._last_sigq,
+                "fail_streak": self._fail_streak
             }
             
         except Exception as e:
@@ -207,7 +333,8 @@ class SatelliteModem:
                 "error": f"Exception formatting/sending data: {str(e)}",
                 "message": "",
                 "timestamp": "",
-                "signal_quality": -1
+                "signal_quality": -1,
+                "fail_streak": self._fail_streak
             }
             
     def get_diagnostics(self):
@@ -5,13 +5,31 @@ Converts analog pressure reading to water depth in feet
 
 import analogio
 import time
+from array import array
+from micropython import const
 from config import *
 
+# Calibration sample cadence (100 ms)
+CALIBRATION_INTERVAL_NS = const(100_000_000)
+
+# Linear conversion from voltage to pressure
+# Assumes sensor outputs 0.5V to 4.5V for 0 to max pressure
+# Adjust these values based on your specific pressure sensor datasheet
+SENSOR_VOLTAGE_MIN = 0.5
+SENSOR_VOLTAGE_MAX = 4.5
+
+# Conversion factors folded once at import so reads only multiply
+_VOLTS_PER_COUNT = PRESSURE_SENSOR_VREF / PRESSURE_SENSOR_RESOLUTION
+_PSI_PER_VOLT = (PRESSURE_SENSOR_MAX_PRESSURE - PRESSURE_SENSOR_MIN_PRESSURE) / (
+    SENSOR_VOLTAGE_MAX - SENSOR_VOLTAGE_MIN
+)
+
 class PressureSensor:
     def __init__(self):
         """Initialize pressure sensor on analog pin"""
         self.analog_pin = analogio.AnalogIn(PRESSURE_SENSOR_PIN)
         self.calibration_offset = 0.0  # Can be adjusted for sensor calibration
+        self.calibration_readings = None  # Samples from the last calibrate_zero()
         
     def read_raw_value(self):
         """Read raw ADC value (0-4095 for 12-bit)"""
@@ -19,77 +37,86 @@ class PressureSensor:
         
     def read_voltage(self):
         """Convert raw ADC to voltage"""
-        raw_value = self.read_raw_value()
-        voltage = (raw_value / PRESSURE_SENSOR_RESOLUTION) * PRESSURE_SENSOR_VREF
-        return voltage
+        return self.analog_pin.value * _VOLTS_PER_COUNT
         
     def read_pressure_psi(self):
         """Convert voltage to pressure in PSI"""
-        voltage = self.read_voltage()
-        
-        # Linear conversion from voltage to pressure
-        # Assumes sensor outputs 0.5V to 4.5V for 0 to max pressure
-        # Adjust these values based on your specific pressure sensor datasheet
-        voltage_min = 0.5
-        voltage_max = 4.5
-        
-        if voltage < voltage_min:
-            voltage = voltage_min
-        elif voltage > voltage_max:
-            voltage = voltage_max
-            
-        # Linear interpolation
-        pressure_range = PRESSURE_SENSOR_MAX_PRESSURE - PRESSURE_SENSOR_MIN_PRESSURE
-        voltage_range = voltage_max - voltage_min
-        
-        pressure = PRESSURE_SENSOR_MIN_PRESSURE + (
-            (voltage - voltage_min) / voltage_range
-        ) * pressure_range
-        
-        return pressure + self.calibration_offset
+        return self._sample_all()[2]
         
     def read_water_depth_feet(self):
         """Convert pressure to water depth in feet"""
-        pressure_psi = self.read_pressure_psi()
-        
-        # Subtract atmospheric pressure to get gauge pressure
-        gauge_pressure = pressure_psi - ATMOSPHERIC_PRESSURE
-        
-        # Convert to water depth (feet)
-        # 1 foot of water = 0.433 psi
-        if gauge_pressure <= 0:
-            return 0.0
-            
-        depth_feet = gauge_pressure / WATER_DENSITY_FACTOR
-        return max(0.0, depth_feet)  # Ensure non-negative depth
+        return self._sample_all()[3]
+        
+    def _sample_all(self):
+        """
+        Take one ADC sample and derive every reading from it
+        Returns: (raw, voltage, pressure_psi, depth_feet)
+        """
+        raw = self.analog_pin.value
+        voltage = raw * _VOLTS_PER_COUNT
+        
+        # Clamp to the sensor's output span, then linear interpolation
+        clamped = voltage
+        if clamped < SENSOR_VOLTAGE_MIN:
+            clamped = SENSOR_VOLTAGE_MIN
+        elif clamped > SENSOR_VOLTAGE_MAX:
+            clamped = SENSOR_VOLTAGE_MAX
+        pressure = (PRESSURE_SENSOR_MIN_PRESSURE +
+                    (clamped - SENSOR_VOLTAGE_MIN) * _PSI_PER_VOLT +
+                    self.calibration_offset)
+        
+        # Subtract atmospheric pressure to get gauge pressure, then convert
+        # to water depth (1 foot of water = 0.433 psi), never negative
+        gauge_pressure = pressure - ATMOSPHERIC_PRESSURE
+        depth_feet = gauge_pressure / WATER_DENSITY_FACTOR if gauge_pressure > 0 else 0.0
+        
+        return raw, voltage, pressure, depth_feet
         
     def take_averaged_reading(self, num_samples=10, delay_ms=100):
         """Take multiple readings and return average for better accuracy"""
-        readings = []
+        if num_samples <= 0:
+            return 0.0
+            
+        # Single pass: keep a running sum plus the extremes, no list or sort
+        total = 0.0
+        lowest = float('inf')
+        highest = float('-inf')
+        delay_s = delay_ms / 1000.0
         
         for _ in range(num_samples):
-            readings.append(self.read_water_depth_feet())
-            time.sleep(delay_ms / 1000.0)
-            
-        # Remove outliers (simple method: remove highest and lowest)
-        if len(readings) > 2:
-            readings.sort()
-            readings = readings[1:-1]  # Remove first and last
+            reading = self._sample_all()[3]
+            total += reading
+            if reading < lowest:
+                lowest = reading
+            if reading > highest:
+                highest = reading
+            time.sleep(delay_s)
             
-        return sum(readings) / len(readings) if readings else 0.0
+        # Remove outliers (simple method: drop highest and lowest)
+        if num_samples > 2:
+            return (total - lowest - highest) / (num_samples - 2)
+        return total / num_samples
         
     def calibrate_zero(self, num_samples=50):
         """Calibrate sensor to zero depth (call when sensor is at atmospheric pressure)"""
-        print("Calibrating pressure sensor to zero depth...")
-        pressure_readings = []
-        
+        print(f"Calibrating pressure sensor to zero depth ({num_samples} samples)...")
+        # Preallocated float32 buffer plus a running total, no list growth
+        self.calibration_readings = array('f', [0.0] * num_samples)
+        total = 0.0
+        
+        # Sleep only until the next 100 ms deadline so per-sample overhead
+        # doesn't stretch the run or make the cadence drift
+        deadline = time.monotonic_ns()
         for i in range(num_samples):
-            pressure_readings.append(self.read_pressure_psi())
-            time.sleep(0.1)
-            if (i + 1) % 10 == 0:
-                print(f"Calibration progress: {i + 1}/{num_samples}")
+            pressure = self._sample_all()[2]
+            self.calibration_readings[i] = pressure
+            total += pressure
+            deadline += CALIBRATION_INTERVAL_NS
+            remaining = deadline - time.monotonic_ns()
+            if remaining > 0:
+                time.sleep(remaining / 1e9)
                 
-        avg_pressure = sum(pressure_readings) / len(pressure_readings)
+        avg_pressure = total / num_samples
         self.calibration_offset = ATMOSPHERIC_PRESSURE - avg_pressure
         
         print(f"Calibration complete. Offset: {self.calibration_offset:.3f} psi")
@@ -97,10 +124,8 @@ class PressureSensor:
         
     def get_sensor_diagnostics(self):
         """Return diagnostic information about sensor readings"""
-        raw = self.read_raw_value()
-        voltage = self.read_voltage()
-        pressure = self.read_pressure_psi()
-        depth = self.read_water_depth_feet()
+        # One ADC sample so all four values describe the same instant
+        raw, voltage, pressure, depth = self._sample_all()
         
         return {
             "raw_adc": raw,
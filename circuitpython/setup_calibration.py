@@ -33,13 +33,13 @@ def setup_menu():
     while True:
         try:
             choice = input("Enter choice (1-8): ").strip()
-            if choice in ['1', '2', '3', '4', '5', '6', '7', '8']:
+            if choice in DISPATCH or choice == EXIT_CHOICE:
                 return choice
             print("Invalid choice. Please enter 1-8.")
         except:
             print("Please enter a number 1-8")
             
-def test_hardware():
+def test_hardware(i2c, sensor):
     """Test all hardware components"""
     print("\nTesting Hardware Components...")
     print("-" * 40)
@@ -48,10 +48,9 @@ def test_hardware():
     
     # Test I2C and RTC
     try:
-        i2c = busio.I2C(I2C_SCL, I2C_SDA)
         time_mgr = TimeManager(i2c)
-        time_info = time_mgr.get_system_info()
-        print(f"✓ RTC: {time_info['pacific_time']}")
+        snap = time_mgr.snapshot()
+        print(f"✓ RTC: {snap['pacific_time']}")
         results['rtc'] = True
     except Exception as e:
         print(f"✗ RTC Error: {e}")
@@ -59,7 +58,6 @@ def test_hardware():
         
     # Test pressure sensor
     try:
-        sensor = PressureSensor()
         sensor_data = sensor.get_sensor_diagnostics()
         print(f"✓ Pressure Sensor: {sensor_data['depth_feet']:.2f}ft, {sensor_data['voltage']:.3f}V")
         results['sensor'] = True
@@ -84,8 +82,8 @@ def test_hardware():
     # Test power management
     try:
         power_mgr = PowerManager()
-        power_info = power_mgr.get_power_diagnostics()
-        print(f"✓ Power: {power_info['battery_voltage']:.2f}V ({power_info['battery_percentage']}%)")
+        battery_status = power_mgr.check_battery_status()
+        print(f"✓ Power: {battery_status['voltage']:.2f}V ({battery_status['percentage']}%)")
         results['power'] = True
     except Exception as e:
         print(f"✗ Power Management Error: {e}")
@@ -113,25 +111,23 @@ def test_hardware():
     
     return results
 
-def set_rtc_time():
+def set_rtc_time(i2c, sensor):
     """Set RTC time interactively"""
     print("\nSetting RTC Time...")
     print("Enter current Pacific Time (PST/PDT)")
     
     try:
-        year = int(input("Year (YYYY): "))
-        month = int(input("Month (1-12): "))
-        day = int(input("Day (1-31): "))
-        hour = int(input("Hour (0-23): "))
-        minute = int(input("Minute (0-59): "))
-        second = int(input("Second (0-59): "))
+        # Everything on one line, e.g. 2024,3,15,14,30,0,y
+        parts = input("Enter YYYY,MM,DD,HH,MM,SS,PDT(y/n): ").strip().split(',')
+        if len(parts) != 7:
+            raise ValueError("expected 7 comma-separated fields")
+        year, month, day, hour, minute, second = (int(x) for x in parts[:6])
+        is_dst = parts[6].strip().lower().startswith('y')
         
-        i2c = busio.I2C(I2C_SCL, I2C_SDA)
         time_mgr = TimeManager(i2c)
         
         # Convert Pacific time to UTC for storage
         # This is a simplified conversion - doesn't account for DST transitions
-        is_dst = input("Is this Daylight Saving Time (PDT)? (y/n): ").lower().startswith('y')
         utc_offset = TIMEZONE_OFFSET_PDT if is_dst else TIMEZONE_OFFSET_PST
         
         # Convert to UTC
@@ -146,17 +142,18 @@ def set_rtc_time():
         time_mgr.set_rtc_time(year, month, day, utc_hour, minute, second)
         print("✓ RTC time set successfully")
         
+    except ValueError as e:
+        print(f"✗ Invalid time entry: {e}")
     except Exception as e:
         print(f"✗ Error setting RTC time: {e}")
 
-def calibrate_pressure_sensor():
+def calibrate_pressure_sensor(i2c, sensor):
     """Calibrate pressure sensor for zero depth"""
     print("\nPressure Sensor Calibration...")
     print("IMPORTANT: Ensure sensor is at atmospheric pressure (zero depth)")
     input("Press Enter when ready to calibrate...")
     
     try:
-        sensor = PressureSensor()
         offset = sensor.calibrate_zero()
         print(f"✓ Calibration complete. Offset: {offset:.3f} psi")
         
@@ -173,7 +170,7 @@ def calibrate_pressure_sensor():
     except Exception as e:
         print(f"✗ Calibration error: {e}")
 
-def test_satellite_communication():
+def test_satellite_communication(i2c, sensor):
     """Test satellite communication with actual message"""
     print("\nTesting Satellite Communication...")
     print("WARNING: This will use satellite airtime credits!")
@@ -190,9 +187,7 @@ def test_satellite_communication():
             print("✗ Could not initialize satellite modem")
             return
             
-        i2c = busio.I2C(I2C_SCL, I2C_SDA)
         time_mgr = TimeManager(i2c)
-        sensor = PressureSensor()
         
         print("Sending test message...")
         
@@ -215,7 +210,7 @@ def test_satellite_communication():
     except Exception as e:
         print(f"✗ Satellite test error: {e}")
 
-def initialize_storage():
+def initialize_storage(i2c, sensor):
     """Initialize SD card and create necessary files"""
     print("\nInitializing Storage...")
     
@@ -243,7 +238,7 @@ def initialize_storage():
             "battery_voltage": 4.1
         }
         
-        if storage_mgr.log_sensor_reading("SETUP_TEST", test_data):
+        if storage_mgr.log_sensor_reading("SETUP_TEST", test_data) and storage_mgr.flush():
             print("✓ Test log entry created")
         else:
             print("⚠ Could not create log entry")
@@ -254,7 +249,7 @@ def initialize_storage():
     except Exception as e:
         print(f"✗ Storage initialization error: {e}")
 
-def run_full_system_test():
+def run_full_system_test(i2c, sensor):
     """Run complete system test simulating normal operation"""
     print("\nRunning Full System Test...")
     print("This simulates a complete wake-up cycle")
@@ -266,16 +261,15 @@ def run_full_system_test():
         storage_mgr = StorageManager()
         storage_mgr.initialize()
         
-        i2c = busio.I2C(I2C_SCL, I2C_SDA)
         time_mgr = TimeManager(i2c)
-        sensor = PressureSensor()
         
         # Load state
         state = storage_mgr.load_state()
         state['total_wake_cycles'] = state.get('total_wake_cycles', 0) + 1
         
-        # Check time and transmission requirements
-        is_tx_time, tx_slot = time_mgr.is_transmission_time(tolerance_minutes=60)  # Wider window for testing
+        # Check time and transmission requirements from a single RTC read
+        snap = time_mgr.snapshot(tolerance_minutes=60)  # Wider window for testing
+        is_tx_time, tx_slot = snap["is_transmission_time"], snap["next_transmission"]
         print(f"Transmission time check: {is_tx_time} (slot: {tx_slot})")
         
         # Take sensor readings
@@ -287,8 +281,11 @@ def run_full_system_test():
         print(f"Battery: {battery_status['voltage']:.2f}V")
         
         # Log the reading
-        timestamp = time_mgr.get_timestamp_string()
-        storage_mgr.log_sensor_reading(timestamp, sensor_data)
+        storage_mgr.log_sensor_reading(
+            snap["timestamp"], sensor_data,
+            utc_epoch=time.mktime(snap["utc"]) if BINARY_LOG else 0
+        )
+        storage_mgr.flush()
         
         # Save state
         storage_mgr.save_state(state)
@@ -301,7 +298,7 @@ def run_full_system_test():
     except Exception as e:
         print(f"✗ System test error: {e}")
 
-def view_diagnostics():
+def view_diagnostics(i2c, sensor):
     """View current system diagnostics"""
     print("\nSystem Diagnostics...")
     print("-" * 40)
@@ -309,18 +306,16 @@ def view_diagnostics():
     try:
         # Power diagnostics
         power_mgr = PowerManager()
-        power_info = power_mgr.get_power_diagnostics()
-        print(f"Battery: {power_info['battery_voltage']:.2f}V ({power_info['battery_percentage']}%)")
+        battery_status = power_mgr.check_battery_status()
+        print(f"Battery: {battery_status['voltage']:.2f}V ({battery_status['percentage']}%)")
         
         # Time diagnostics
-        i2c = busio.I2C(I2C_SCL, I2C_SDA)
         time_mgr = TimeManager(i2c)
-        time_info = time_mgr.get_system_info()
-        print(f"Time: {time_info['pacific_time']}")
-        print(f"Next transmission: {time_info['minutes_until_next']} minutes")
+        snap = time_mgr.snapshot()
+        print(f"Time: {snap['pacific_time']}")
+        print(f"Next transmission: {snap['minutes_until_next']} minutes")
         
         # Sensor diagnostics
-        sensor = PressureSensor()
         sensor_data = sensor.get_sensor_diagnostics()
         print(f"Depth: {sensor_data['depth_feet']:.2f}ft")
         print(f"Pressure: {sensor_data['pressure_psi']:.2f}psi")
@@ -335,37 +330,44 @@ def view_diagnostics():
             # Load and display state
             state = storage_mgr.load_state()
             print(f"Wake cycles: {state.get('total_wake_cycles', 0)}")
-            print(f"Failed attempts: {len(state.get('failed_attempts', []))}")
+            failed = state.get('failed_attempts', {})
+            print(f"Failed attempts: {sum(len(attempts) for attempts in failed.values())}")
         else:
             print("Storage: Not available")
             
     except Exception as e:
         print(f"Error getting diagnostics: {e}")
 
+# Menu choice -> setup action
+DISPATCH = {
+    '1': test_hardware,
+    '2': set_rtc_time,
+    '3': calibrate_pressure_sensor,
+    '4': test_satellite_communication,
+    '5': initialize_storage,
+    '6': run_full_system_test,
+    '7': view_diagnostics,
+}
+EXIT_CHOICE = '8'
+
 def main():
     """Main setup program"""
-    while True:
-        choice = setup_menu()
-        
-        if choice == '1':
-            test_hardware()
-        elif choice == '2':
-            set_rtc_time()
-        elif choice == '3':
-            calibrate_pressure_sensor()
-        elif choice == '4':
-            test_satellite_communication()
-        elif choice == '5':
-            initialize_storage()
-        elif choice == '6':
-            run_full_system_test()
-        elif choice == '7':
-            view_diagnostics()
-        elif choice == '8':
-            print("\nSetup complete! Replace this file with main.py to run normal operation.")
-            break
-            
-        input("\nPress Enter to continue...")
+    # One I2C bus and one pressure sensor shared by every menu action,
+    # instead of re-initializing them each time round the menu
+    with busio.I2C(I2C_SCL, I2C_SDA) as i2c:
+        sensor = PressureSensor()
+        try:
+            while True:
+                choice = setup_menu()
+                
+                if choice == EXIT_CHOICE:
+                    print("\nSetup complete! Replace this file with main.py to run normal operation.")
+                    break
+                DISPATCH[choice](i2c, sensor)
+                    
+                input("\nPress Enter to continue...")
+        finally:
+            sensor.deinit()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
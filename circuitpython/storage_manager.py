@@ -1,48 +1,162 @@
 """
 SD card storage management for state persistence and data logging
-Handles JSON state files, CSV data logs, and error logging
+Handles state files, CSV data logs, and error logging
 """
 
 import os
-import json
 import time
+import struct
 import busio
 import digitalio
-import adafruit_sdcard
 import storage
+try:
+    import sdcardio  # Native SD driver built into most CircuitPython builds
+except ImportError:
+    sdcardio = None
+from micropython import const
 from config import *
 
+# Debug guard for this module; messages pass print() separate args, so
+# nothing is formatted unless debugging
+_DBG = DEBUG_MODE
+
+CSV_HEADER = ("timestamp,depth_feet,pressure_raw,battery_voltage,"
+              "transmission_success,transmission_attempts,signal_quality,error\n")
+CSV_ROW_FORMAT = "%s,%.2f,%d,%.2f,%s,%s,%s,\"%s\"\n"
+
+# Buffered CSV rows are written out once they reach this many bytes; also
+# the block size threshold flushes align to (a multiple of the 512 B sector)
+LOG_FLUSH_BYTES = const(2048)
+
+# Buffered error lines are written out once they reach this many bytes
+ERR_FLUSH_BYTES = const(512)
+
+# Data log is rotated to <log>.old once it grows past this size
+LOG_ROTATE_BYTES = const(1_000_000)
+
+# Failed attempts kept per transmission slot
+MAX_FAILED_PER_SLOT = const(3)
+
+def _encode_state(state):
+    """
+    Serialize the state dict into one line per value, avoiding json
+    Line tags: T slot=success time, F slot,time,ok,error (failed attempt),
+    B/I/R/S key=value (bool/int/float/str), E key= (empty list)
+    Returns: the encoded text, or None if a value doesn't fit the format
+    """
+    lines = []
+    for key, value in state.items():
+        if key == "last_successful_transmissions":
+            for slot, ts in value.items():
+                lines.append("T%s=%r" % (slot, ts))
+        elif key == "failed_attempts":
+            for slot, attempts in value.items():
+                for attempt in attempts:
+                    error = attempt.get("error", "")
+                    if "\n" in error:
+                        return None
+                    lines.append("F%s,%r,%d,%s" % (
+                        slot, attempt["timestamp"], attempt["success"], error
+                    ))
+        elif isinstance(value, bool):
+            lines.append("B%s=%d" % (key, value))
+        elif isinstance(value, int):
+            lines.append("I%s=%d" % (key, value))
+        elif isinstance(value, float):
+            lines.append("R%s=%r" % (key, value))
+        elif isinstance(value, str) and "\n" not in value:
+            lines.append("S%s=%s" % (key, value))
+        elif value == []:
+            lines.append("E%s=" % key)
+        else:
+            return None
+    lines.append("")
+    return "\n".join(lines)
+    
+def _decode_state(text):
+    """Parse text written by _encode_state back into a state dict"""
+    state = {"last_successful_transmissions": {}, "failed_attempts": {}}
+    for line in text.split("\n"):
+        if not line:
+            continue
+        tag = line[0]
+        if tag == "F":
+            slot, ts, ok, error = line[1:].split(",", 3)
+            state["failed_attempts"].setdefault(slot, []).append({
+                "time_slot": slot,
+                "timestamp": float(ts),
+                "success": ok == "1",
+                "error": error
+            })
+            continue
+            
+        key, value = line[1:].split("=", 1)
+        if tag == "T":
+            state["last_successful_transmissions"][key] = float(value)
+        elif tag == "B":
+            state[key] = value == "1"
+        elif tag == "I":
+            state[key] = int(value)
+        elif tag == "R":
+            state[key] = float(value)
+        elif tag == "S":
+            state[key] = value
+        elif tag == "E":
+            state[key] = []
+        else:
+            raise ValueError(f"Unknown state line: {line}")
+    return state
+
 class StorageManager:
     def __init__(self):
         """Initialize SD card storage"""
         self.spi = None
         self.sdcard = None
+        self.cs_pin = None  # Only used by the adafruit_sdcard fallback
         self.vfs = None
         self.is_mounted = False
         self.mount_point = "/sd"
         
+        # CSV rows (or BIN_LOG_RECORD bytes) buffered in RAM, written in one go by flush_logs()
+        self._log_path = BIN_LOG_FILE if BINARY_LOG else LOG_FILE
+        self._log_buf = []
+        self._log_buf_bytes = 0
+        self._log_bytes_written = 0  # Data log size, read once on mount then counted
+        
+        # Error lines buffered the same way, written by flush_errors()
+        self._err_buf = []
+        self._err_buf_bytes = 0
+        
         # Default state structure
         self.default_state = {
             "last_successful_transmissions": {},  # {"05:00": "timestamp", "13:00": "timestamp"}
-            "failed_attempts": [],  # List of failed transmission attempts
+            "failed_attempts": {},  # {"05:00": [attempt, ...]} failed attempts per slot
             "last_wake_time": "",
             "total_wake_cycles": 0,
             "sensor_calibration_offset": 0.0,
             "battery_low_count": 0,
+            "sat_fail_streak": 0,  # Consecutive failed transmissions, drives skip-cycle backoff
             "system_errors": []
         }
         
     def initialize(self):
         """Initialize and mount SD card"""
         try:
+            # Release the card, CS pin and bus left over from an earlier
+            # failed attempt, or rebuilding them fails with "pin in use"
+            self._release_card()
+                
             # Setup SPI for SD card
             self.spi = busio.SPI(SPI_SCK, SPI_MOSI, SPI_MISO)
             
-            # Setup SD card chip select
-            cs_pin = digitalio.DigitalInOut(SD_CS_PIN)
-            
-            # Initialize SD card
-            self.sdcard = adafruit_sdcard.SDCard(self.spi, cs_pin)
+            # Initialize SD card at SD_BAUDRATE - the native driver does its
+            # CRC and block transfers in C; adafruit_sdcard is the fallback
+            if sdcardio:
+                self.sdcard = sdcardio.SDCard(self.spi, SD_CS_PIN, baudrate=SD_BAUDRATE)
+            else:
+                import adafruit_sdcard
+                self.cs_pin = digitalio.DigitalInOut(SD_CS_PIN)
+                self.sdcard = adafruit_sdcard.SDCard(self.spi, self.cs_pin, baudrate=SD_BAUDRATE)
             self.vfs = storage.VfsFat(self.sdcard)
             
             # Mount SD card
@@ -52,16 +166,58 @@ class StorageManager:
             # Create necessary directories
             self._ensure_directory_structure()
             
-            if DEBUG_MODE:
+            # Size the data log once; flush_logs() keeps the count from here
+            try:
+                self._log_bytes_written = os.stat(self._log_path)[6]
+            except OSError:
+                self._log_bytes_written = 0
+            
+            if _DBG:
                 print("SD card mounted successfully")
             return True
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"SD card initialization failed: {e}")
+            if _DBG:
+                print("SD card initialization failed:", e)
             self.is_mounted = False
             return False
             
+    def _release_card(self):
+        """Deinit the SD card driver, CS pin and SPI bus, if any"""
+        self.vfs = None
+        if self.sdcard is not None:
+            try:
+                self.sdcard.deinit()  # sdcardio; adafruit_sdcard has no deinit
+            except Exception:
+                pass
+            self.sdcard = None
+        if self.cs_pin is not None:
+            self.cs_pin.deinit()
+            self.cs_pin = None
+        if self.spi is not None:
+            self.spi.deinit()
+            self.spi = None
+            
+    def _ensure_mounted(self):
+        """
+        Cheap mount check for the public methods
+        On a miss, remount the card we already have before rebuilding the
+        whole SPI/SD driver stack with initialize()
+        """
+        if self.is_mounted:
+            return True
+            
+        if self.vfs is not None:
+            try:
+                storage.mount(self.vfs, self.mount_point)
+                self.is_mounted = True
+                return True
+            except Exception as e:
+                if _DBG:
+                    print("SD card remount failed:", e)
+                    
+        return self.initialize()
+        
     def _ensure_directory_structure(self):
         """Create necessary directories on SD card"""
         try:
@@ -72,118 +228,222 @@ class StorageManager:
                 except OSError:
                     pass  # Directory already exists
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error creating directories: {e}")
+            if _DBG:
+                print("Error creating directories:", e)
                 
     def load_state(self):
-        """Load system state from JSON file"""
-        if not self.is_mounted:
-            if not self.initialize():
-                return self.default_state.copy()
+        """Load system state from the state file"""
+        if not self._ensure_mounted():
+            return self.default_state.copy()
                 
         try:
-            with open(STATE_FILE, 'r') as f:
-                state = json.load(f)
+            # A save interrupted after rotation leaves only the backup
+            path = LEGACY_STATE_FILE
+            for candidate in (STATE_FILE, STATE_BACKUP_FILE):
+                if self._file_exists(candidate):
+                    path = candidate
+                    break
+            with open(path, 'r') as f:
+                text = f.read()
+                
+            # Files that start with "{" were written as json (legacy file,
+            # or a state value the line format can't represent)
+            if text.startswith("{"):
+                import json
+                state = json.loads(text)
+            else:
+                state = _decode_state(text)
                 
             # Merge with default state to handle new fields
             merged_state = self.default_state.copy()
             merged_state.update(state)
             
-            if DEBUG_MODE:
+            # Older state files kept failed attempts as one flat list
+            if isinstance(merged_state["failed_attempts"], list):
+                by_slot = {}
+                for attempt in merged_state["failed_attempts"]:
+                    by_slot.setdefault(attempt.get("time_slot"), []).append(attempt)
+                merged_state["failed_attempts"] = by_slot
+            
+            if _DBG:
                 print("State loaded from SD card")
             return merged_state
             
         except (OSError, ValueError, KeyError) as e:
-            if DEBUG_MODE:
-                print(f"Error loading state (using defaults): {e}")
+            if _DBG:
+                print("Error loading state (using defaults):", e)
             return self.default_state.copy()
             
     def save_state(self, state):
-        """Save system state to JSON file"""
-        if not self.is_mounted:
-            if not self.initialize():
-                return False
+        """Save system state to the state file"""
+        if not self._ensure_mounted():
+            return False
                 
         try:
-            # Create backup first
+            # Rotate the current file into the backup slot - a FAT
+            # directory-entry update instead of re-reading and re-writing it
+            try:
+                os.remove(STATE_BACKUP_FILE)
+            except OSError:
+                pass  # No previous backup
             try:
-                with open(STATE_FILE, 'r') as f:
-                    backup_data = f.read()
-                with open("/sd/backup/state_backup.json", 'w') as f:
-                    f.write(backup_data)
-            except:
-                pass  # Ignore backup errors
+                os.rename(STATE_FILE, STATE_BACKUP_FILE)
+            except OSError:
+                pass  # No state file yet
                 
-            # Save new state
+            text = _encode_state(state)
+            if text is None:
+                # Serialize up front; json.dump() would issue a write per element
+                import json
+                text = json.dumps(state)
+                
+            # Save new state in a single write
             with open(STATE_FILE, 'w') as f:
-                json.dump(state, f)
+                f.write(text)
                 
-            if DEBUG_MODE:
+            if _DBG:
                 print("State saved to SD card")
             return True
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error saving state: {e}")
+            if _DBG:
+                print("Error saving state:", e)
             return False
             
-    def log_sensor_reading(self, timestamp, sensor_data, transmission_result=None):
-        """Log sensor reading to CSV file"""
-        if not self.is_mounted:
-            if not self.initialize():
-                return False
+    def log_sensor_reading(self, timestamp, sensor_data, transmission_result=None, utc_epoch=0):
+        """
+        Log sensor reading to the data log (buffered until flush_logs())
+        utc_epoch: UTC seconds stored in binary records (BINARY_LOG) in place of timestamp
+        """
+        if not self._ensure_mounted():
+            return False
                 
         try:
-            # Check if log file exists, create header if not
-            file_exists = True
-            try:
-                with open(LOG_FILE, 'r'):
-                    pass
-            except OSError:
-                file_exists = False
-                
-            with open(LOG_FILE, 'a') as f:
-                if not file_exists:
-                    # Write CSV header
-                    f.write("timestamp,depth_feet,pressure_raw,battery_voltage,")
-                    f.write("transmission_success,transmission_attempts,signal_quality,error\n")
-                
-                # Write data row
-                tx_success = transmission_result.get("success", False) if transmission_result else False
-                tx_attempts = transmission_result.get("attempts", 0) if transmission_result else 0
-                signal_quality = transmission_result.get("signal_quality", -1) if transmission_result else -1
-                error = transmission_result.get("error", "") if transmission_result else ""
-                
-                f.write(f"{timestamp},{sensor_data['depth_feet']:.2f},{sensor_data['raw_adc']},")
-                f.write(f"{sensor_data.get('battery_voltage', 0.0):.2f},{tx_success},{tx_attempts},")
-                f.write(f"{signal_quality},\"{error}\"\n")
-                
+            tx_success = transmission_result.get("success", False) if transmission_result else False
+            tx_attempts = transmission_result.get("attempts", 0) if transmission_result else 0
+            signal_quality = transmission_result.get("signal_quality", -1) if transmission_result else -1
+            error = transmission_result.get("error", "") if transmission_result else ""
+            if signal_quality is None:
+                signal_quality = -1  # Modem didn't answer the signal query
+            
+            if BINARY_LOG:
+                # One fixed-size record, no float-to-decimal formatting
+                depth = sensor_data['depth_feet']
+                raw_adc = sensor_data['raw_adc']
+                battery = sensor_data.get('battery_voltage', 0.0)
+                try:
+                    row = struct.pack(
+                        BIN_LOG_RECORD, int(utc_epoch), depth, raw_adc, battery,
+                        tx_success, min(255, int(tx_attempts)), int(signal_quality),
+                        error[:32].encode()
+                    )
+                except Exception as e:
+                    # Keep the reading; only the transmission fields are replaced
+                    row = struct.pack(
+                        BIN_LOG_RECORD, int(utc_epoch), depth, raw_adc, battery,
+                        tx_success, 0, -1, ("pack: %s" % e)[:32].encode()
+                    )
+            else:
+                row = CSV_ROW_FORMAT % (
+                    timestamp, sensor_data['depth_feet'], sensor_data['raw_adc'],
+                    sensor_data.get('battery_voltage', 0.0), tx_success, tx_attempts,
+                    signal_quality, error
+                )
+            self._log_buf.append(row)
+            self._log_buf_bytes += len(row)
+            
+            if self._log_buf_bytes >= LOG_FLUSH_BYTES:
+                return self.flush_logs(aligned=True)
+            return True
+            
+        except Exception as e:
+            if _DBG:
+                print("Error logging sensor reading:", e)
+            return False
+            
+    def flush_logs(self, aligned=False):
+        """
+        Append buffered rows to the data log with a single write
+        aligned: write only up to the last LOG_FLUSH_BYTES boundary in the
+                 file and keep the tail buffered (used for threshold flushes)
+        """
+        if not self._log_buf:
+            return True
+            
+        if BINARY_LOG:
+            data = b"".join(self._log_buf)
+        elif self._log_bytes_written:
+            data = "".join(self._log_buf)
+        else:
+            # An empty CSV log gets its header in the same write
+            data = CSV_HEADER + "".join(self._log_buf)
+        self._log_buf = []
+        self._log_buf_bytes = 0
+        
+        try:
+            with open(self._log_path, 'ab' if BINARY_LOG else 'a') as f:
+                if aligned:
+                    # End the write on a whole-block boundary so the card
+                    # gets full multi-sector writes; CSV rows are ASCII
+                    # so characters and bytes line up
+                    start = self._log_bytes_written
+                    end = (start + len(data)) // LOG_FLUSH_BYTES * LOG_FLUSH_BYTES
+                    if end > start:
+                        tail = data[end - start:]
+                        data = data[:end - start]
+                        if tail:
+                            self._log_buf.append(tail)
+                            self._log_buf_bytes = len(tail)
+                f.write(data)
+                self._log_bytes_written += len(data)
             return True
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error logging sensor reading: {e}")
+            if _DBG:
+                print("Error writing sensor log:", e)
             return False
             
+    def flush(self):
+        """Write out everything buffered this wake; call before power-down"""
+        errors_ok = self.flush_errors()
+        return self.flush_logs() and errors_ok
+        
     def log_error(self, error_message, error_type="GENERAL"):
-        """Log error message with timestamp"""
-        if not self.is_mounted:
-            if not self.initialize():
-                return False
+        """Log error message with timestamp (buffered until flush_errors())"""
+        if not self._ensure_mounted():
+            return False
                 
-        try:
-            timestamp = time.monotonic()  # Use monotonic time for error logging
+        timestamp = time.monotonic()  # Use monotonic time for error logging
+        line = f"{timestamp},{error_type},\"{error_message}\"\n"
+        self._err_buf.append(line)
+        self._err_buf_bytes += len(line)
+        
+        if _DBG:
+            print("Error logged:", error_type, "-", error_message)
             
+        # Errors come in bursts; the state save at the end of the wake is
+        # the recovery point, so they don't need to hit the card one by one
+        if self._err_buf_bytes >= ERR_FLUSH_BYTES:
+            return self.flush_errors()
+        return True
+        
+    def flush_errors(self):
+        """Append buffered error lines to the error log with a single write"""
+        if not self._err_buf:
+            return True
+            
+        data = "".join(self._err_buf)
+        self._err_buf = []
+        self._err_buf_bytes = 0
+        
+        try:
             with open(ERROR_LOG, 'a') as f:
-                f.write(f"{timestamp},{error_type},\"{error_message}\"\n")
-                
-            if DEBUG_MODE:
-                print(f"Error logged: {error_type} - {error_message}")
+                f.write(data)
             return True
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Failed to log error: {e}")
+            if _DBG:
+                print("Failed to log error:", e)
             return False
             
     def record_transmission_attempt(self, state, time_slot, success, error_message=""):
@@ -202,28 +462,31 @@ class StorageManager:
             state["last_successful_transmissions"][time_slot] = timestamp
             
             # Remove any failed attempts for this time slot
-            state["failed_attempts"] = [
-                attempt for attempt in state["failed_attempts"]
-                if attempt.get("time_slot") != time_slot
-            ]
+            state["failed_attempts"].pop(time_slot, None)
         else:
-            # Record failed attempt
-            state["failed_attempts"].append(attempt_record)
-            
-            # Limit failed attempts list size
-            if len(state["failed_attempts"]) > 10:
-                state["failed_attempts"] = state["failed_attempts"][-10:]
+            # Record failed attempt, keeping only the most recent per slot
+            attempts = state["failed_attempts"].setdefault(time_slot, [])
+            attempts.append(attempt_record)
+            if len(attempts) > MAX_FAILED_PER_SLOT:
+                del attempts[0]
                 
         return state
         
     def get_pending_transmissions(self, state, current_time_manager):
         """Get list of transmissions that need to be sent"""
+        # Same answer for every slot, so ask the clock once
+        is_time, current_slot = current_time_manager.is_transmission_time()
+        
+        # Nothing to retry and no window open: no slot can be pending
+        if not is_time and not state["failed_attempts"]:
+            return []
+            
         pending = []
         current_time = time.monotonic()
         
         # Check each scheduled transmission time
         for hour, minute in TRANSMISSION_TIMES:
-            time_slot = f"{hour:02d}:{minute:02d}"
+            time_slot = SLOT_STRINGS[(hour, minute)]
             
             # Check if we have a recent successful transmission for this slot
             last_success = state["last_successful_transmissions"].get(time_slot, 0)
@@ -234,9 +497,8 @@ class StorageManager:
                 
             # Check if we have recent failed attempts
             recent_failures = [
-                attempt for attempt in state["failed_attempts"]
-                if (attempt.get("time_slot") == time_slot and 
-                    current_time - attempt.get("timestamp", 0) < 6 * 3600)
+                attempt for attempt in state["failed_attempts"].get(time_slot, ())
+                if current_time - attempt.get("timestamp", 0) < 6 * 3600
             ]
             
             if recent_failures:
@@ -246,9 +508,8 @@ class StorageManager:
                     "last_attempt": recent_failures[-1]
                 })
             else:
-                # New transmission needed
-                is_time, _ = current_time_manager.is_transmission_time()
-                if is_time:
+                # New transmission needed if this slot's window is open now
+                if is_time and current_slot == (hour, minute):
                     pending.append({
                         "time_slot": time_slot,
                         "retry_count": 0,
@@ -271,11 +532,12 @@ class StorageManager:
             # For now, just rotate the log file if it gets too big
             
             try:
-                stat = os.stat(LOG_FILE)
-                if stat[6] > 1000000:  # If larger than 1MB
+                # Size comes from the running count, no FAT lookup
+                if self._log_bytes_written > LOG_ROTATE_BYTES:
                     # Rotate log file
-                    os.rename(LOG_FILE, f"{LOG_FILE}.old")
-                    if DEBUG_MODE:
+                    os.rename(self._log_path, f"{self._log_path}.old")
+                    self._log_bytes_written = 0  # Fresh CSV file needs a header
+                    if _DBG:
                         print("Log file rotated")
             except OSError:
                 pass  # File doesn't exist or can't be rotated
@@ -283,8 +545,8 @@ class StorageManager:
             return True
             
         except Exception as e:
-            if DEBUG_MODE:
-                print(f"Error during cleanup: {e}")
+            if _DBG:
+                print("Error during cleanup:", e)
             return False
             
     def get_storage_info(self):
@@ -311,7 +573,7 @@ class StorageManager:
                 
                 # Check if critical files exist
                 info["state_file_exists"] = self._file_exists(STATE_FILE)
-                info["log_file_exists"] = self._file_exists(LOG_FILE)
+                info["log_file_exists"] = self._file_exists(self._log_path)
                 
             except Exception as e:
                 info["error"] = str(e)
@@ -329,9 +591,10 @@ class StorageManager:
     def deinit(self):
         """Clean up resources"""
         try:
+            self.flush()
             if self.is_mounted:
                 storage.umount(self.mount_point)
-            if self.spi:
-                self.spi.deinit()
+                self.is_mounted = False
+            self._release_card()
         except:
             pass  # Ignore cleanup errors
\ No newline at end of file
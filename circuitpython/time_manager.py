@@ -9,15 +9,110 @@ import busio
 import adafruit_ds3231
 from config import *
 
+# Debug guard for this module; messages pass print() separate args, so
+# nothing is formatted unless debugging
+_DBG = DEBUG_MODE
+
+# RTC readings are reused for this long, so a burst of calls within one
+# wake step costs a single I2C transaction
+TIME_CACHE_SECONDS = 0.5
+
+# Transmission schedule as sorted minutes-of-day, with the matching
+# (hour, minute) tuples in the same order
+_TX_HM = tuple(sorted(TRANSMISSION_TIMES, key=lambda hm: hm[0] * 60 + hm[1]))
+_TX_MINUTES = tuple(h * 60 + m for h, m in _TX_HM)
+
+# Month offsets for Sakamoto's day-of-week formula
+_DOW_OFFSETS = (0, 3, 2, 5, 0, 3, 5, 1, 4, 6, 2, 4)
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Days before the first of each month in a non-leap year
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+def _is_leap(year):
+    """True for Gregorian leap years"""
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    
+def _days_in_month(year, month):
+    """Number of days in a month, accounting for leap years"""
+    if month == 2 and _is_leap(year):
+        return 29
+    return _DAYS_IN_MONTH[month - 1]
+    
+def _weekday(year, month, day):
+    """Day of the week for a date (Sakamoto's formula), 0 = Sunday"""
+    y = year - 1 if month < 3 else year
+    return (y + y // 4 - y // 100 + y // 400 + _DOW_OFFSETS[month - 1] + day) % 7
+    
+def _shift_hours(dt, delta_hours):
+    """
+    Shift a struct_time by whole hours without a mktime/localtime round-trip
+    dt: datetime to shift
+    delta_hours: hours to add, less than a day in either direction
+    tm_wday/tm_yday are recomputed from the shifted date, since the DS3231
+    driver doesn't keep them valid
+    """
+    year, month, day = dt.tm_year, dt.tm_mon, dt.tm_mday
+    hour = dt.tm_hour + delta_hours
+    
+    if hour < 0:
+        hour += 24
+        day -= 1
+        if day < 1:
+            month -= 1
+            if month < 1:
+                month = 12
+                year -= 1
+            day = _days_in_month(year, month)
+    elif hour >= 24:
+        hour -= 24
+        day += 1
+        if day > _days_in_month(year, month):
+            day = 1
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+                
+    wday = (_weekday(year, month, day) + 6) % 7  # struct_time counts from Monday
+    yday = _DAYS_BEFORE_MONTH[month - 1] + day + (month > 2 and _is_leap(year))
+    return time.struct_time((year, month, day, hour, dt.tm_min, dt.tm_sec, wday, yday, -1))
+    
+def _first_sunday(year, month):
+    """Day of the month (1-7) of the first Sunday"""
+    return 1 + (7 - _weekday(year, month, 1)) % 7
+
 class TimeManager:
     def __init__(self, i2c=None):
         """Initialize DS3231 RTC"""
+        # Only release the bus in deinit() if we created it here
+        self._owned_i2c = None
         if i2c is None:
-            i2c = busio.I2C(I2C_SCL, I2C_SDA)
+            i2c = self._owned_i2c = busio.I2C(I2C_SCL, I2C_SDA)
         
         self.ds3231 = adafruit_ds3231.DS3231(i2c)
         self.rtc = rtc.RTC()
         
+        # UTC->Pacific offset cached per UTC date (DST is decided by date only)
+        self._tz_offset_seconds = 0
+        self._tz_offset_date = -1
+        
+        # DST window for one year as month*100+day ordinals [start, end)
+        self._dst_year = None
+        self._dst_start_ord = 0
+        self._dst_end_ord = 0
+        
+        # Cached YYYYMMDD_ and YYYYMMDD_HHMM prefixes for log timestamps
+        self._ts_date_key = -1
+        self._ts_date_str = ""
+        self._ts_hm_key = -1
+        self._ts_prefix = ""
+        
+        # Last (utc, pacific) pair read from the DS3231 and when
+        self._pt_cache = None
+        self._pt_cache_monotonic = -1
+        
         # Sync CircuitPython RTC with DS3231 on startup
         self.sync_system_rtc()
         
@@ -25,8 +120,8 @@ class TimeManager:
         """Sync CircuitPython's internal RTC with DS3231"""
         ds_time = self.ds3231.datetime
         self.rtc.datetime = ds_time
-        if DEBUG_MODE:
-            print(f"RTC synced: {self.format_datetime(ds_time)}")
+        if _DBG:
+            print("RTC synced:", self.format_datetime(ds_time))
             
     def get_utc_time(self):
         """Get current UTC time from DS3231"""
@@ -37,101 +132,100 @@ class TimeManager:
         Check if given datetime is during Daylight Saving Time (PDT)
         DST in US: Second Sunday in March to First Sunday in November
         """
-        year, month, day = dt.tm_year, dt.tm_mon, dt.tm_mday
-        
-        # DST starts second Sunday in March
-        if month < 3 or month > 11:
-            return False
-        if month > 3 and month < 11:
-            return True
-            
-        # Calculate second Sunday in March
-        if month == 3:
-            # Find first day of March
-            first_day_weekday = (day - dt.tm_wday - 1) % 7
-            if first_day_weekday == 0:  # First day is Sunday
-                second_sunday = 8
-            else:
-                second_sunday = 15 - first_day_weekday
-            return day >= second_sunday
+        # Work out the window once per year; weekdays come from the date
+        # itself, so a DS3231 with an unset weekday register still works
+        if dt.tm_year != self._dst_year:
+            self._dst_start_ord = 300 + _first_sunday(dt.tm_year, 3) + 7
+            self._dst_end_ord = 1100 + _first_sunday(dt.tm_year, 11)
+            self._dst_year = dt.tm_year
             
-        # Calculate first Sunday in November  
-        if month == 11:
-            first_day_weekday = (day - dt.tm_wday - 1) % 7
-            if first_day_weekday == 0:  # First day is Sunday
-                first_sunday = 1
+        # month * 100 + day orders dates like day-of-year but needs no
+        # month-offset table or leap-day correction
+        return self._dst_start_ord <= dt.tm_mon * 100 + dt.tm_mday < self._dst_end_ord
+        
+    def _get_tz_offset_seconds(self, utc_dt):
+        """Get UTC->Pacific offset, re-evaluating DST only when the date changes"""
+        date_key = utc_dt.tm_year * 10000 + utc_dt.tm_mon * 100 + utc_dt.tm_mday
+        if date_key != self._tz_offset_date:
+            if self.is_daylight_saving_time(utc_dt):
+                # PDT: UTC - 7 hours
+                self._tz_offset_seconds = TIMEZONE_OFFSET_PDT * 3600
             else:
-                first_sunday = 8 - first_day_weekday
-            return day < first_sunday
-            
-        return False
+                # PST: UTC - 8 hours
+                self._tz_offset_seconds = TIMEZONE_OFFSET_PST * 3600
+            self._tz_offset_date = date_key
+        return self._tz_offset_seconds
         
     def utc_to_pacific(self, utc_dt):
         """Convert UTC datetime to Pacific Time (PST/PDT)"""
-        # Convert to timestamp, adjust for timezone, convert back
-        timestamp = time.mktime(utc_dt)
-        
-        if self.is_daylight_saving_time(utc_dt):
-            # PDT: UTC - 7 hours
-            pacific_timestamp = timestamp + (TIMEZONE_OFFSET_PDT * 3600)
-        else:
-            # PST: UTC - 8 hours  
-            pacific_timestamp = timestamp + (TIMEZONE_OFFSET_PST * 3600)
-            
-        return time.localtime(pacific_timestamp)
+        return _shift_hours(utc_dt, self._get_tz_offset_seconds(utc_dt) // 3600)
         
     def get_pacific_time(self):
         """Get current Pacific Time (PST/PDT)"""
-        utc_time = self.get_utc_time()
-        return self.utc_to_pacific(utc_time)
+        return self._read_times()[1]
+        
+    def _read_times(self):
+        """Current (utc, pacific) datetimes, re-reading the DS3231 at most every TIME_CACHE_SECONDS"""
+        now = time.monotonic()
+        if self._pt_cache is None or now - self._pt_cache_monotonic >= TIME_CACHE_SECONDS:
+            utc_time = self.get_utc_time()
+            self._pt_cache = (utc_time, self.utc_to_pacific(utc_time))
+            self._pt_cache_monotonic = now
+        return self._pt_cache
         
-    def is_transmission_time(self, tolerance_minutes=5):
+    def invalidate_time_cache(self):
+        """Force the next time query to read the DS3231"""
+        self._pt_cache = None
+        
+    def minute_of_day(self):
+        """Current Pacific Time as minutes since midnight (0-1439)"""
+        pacific_time = self.get_pacific_time()
+        return pacific_time.tm_hour * 60 + pacific_time.tm_min
+        
+    def is_transmission_time(self, tolerance_minutes=TRANSMISSION_TOLERANCE_MINUTES):
         """
         Check if current time is within transmission window
         tolerance_minutes: How many minutes before/after exact time to allow
         """
         pacific_time = self.get_pacific_time()
-        current_hour = pacific_time.tm_hour
-        current_minute = pacific_time.tm_min
+        return self._transmission_slot(pacific_time.tm_hour * 60 + pacific_time.tm_min,
+                                       tolerance_minutes)
         
-        for target_hour, target_minute in TRANSMISSION_TIMES:
-            # Calculate minutes difference
-            current_total_minutes = current_hour * 60 + current_minute
-            target_total_minutes = target_hour * 60 + target_minute
-            
-            minutes_diff = abs(current_total_minutes - target_total_minutes)
+    def _transmission_slot(self, current_total_minutes, tolerance_minutes):
+        """Find the transmission slot (if any) a Pacific minute-of-day falls in"""
+        # Fast path: the default window is precomputed in config
+        if tolerance_minutes == TRANSMISSION_TOLERANCE_MINUTES:
+            if current_total_minutes not in TRANSMISSION_WINDOW:
+                return False, None
+        
+        for i in range(len(_TX_MINUTES)):
+            minutes_diff = abs(current_total_minutes - _TX_MINUTES[i])
             
             # Handle day boundary (e.g., 23:58 vs 00:02)
             if minutes_diff > 12 * 60:  # More than 12 hours apart
                 minutes_diff = 24 * 60 - minutes_diff
                 
             if minutes_diff <= tolerance_minutes:
-                return True, (target_hour, target_minute)
+                return True, _TX_HM[i]
                 
         return False, None
         
     def minutes_until_next_transmission(self):
         """Calculate minutes until next scheduled transmission"""
         pacific_time = self.get_pacific_time()
-        current_hour = pacific_time.tm_hour
-        current_minute = pacific_time.tm_min
-        current_total_minutes = current_hour * 60 + current_minute
+        return self._minutes_until_next(pacific_time.tm_hour * 60 + pacific_time.tm_min)
         
-        next_minutes = float('inf')
-        
-        for target_hour, target_minute in TRANSMISSION_TIMES:
-            target_total_minutes = target_hour * 60 + target_minute
+    def _minutes_until_next(self, current_total_minutes):
+        """Minutes from a Pacific minute-of-day to the next scheduled transmission"""
+        if not _TX_MINUTES:
+            return 0
             
+        # Schedule is sorted: the first later slot today wins, otherwise
+        # wrap to the first slot tomorrow
+        for target_total_minutes in _TX_MINUTES:
             if target_total_minutes > current_total_minutes:
-                # Same day
-                minutes_until = target_total_minutes - current_total_minutes
-            else:
-                # Next day
-                minutes_until = (24 * 60) - current_total_minutes + target_total_minutes
-                
-            next_minutes = min(next_minutes, minutes_until)
-            
-        return int(next_minutes) if next_minutes != float('inf') else 0
+                return target_total_minutes - current_total_minutes
+        return (24 * 60) - current_total_minutes + _TX_MINUTES[0]
         
     def format_datetime(self, dt, include_timezone=True):
         """Format datetime for logging and display"""
@@ -148,31 +242,62 @@ class TimeManager:
         
     def get_timestamp_string(self):
         """Get current timestamp as string for data logging"""
-        pacific_time = self.get_pacific_time()
-        return f"{pacific_time.tm_year:04d}{pacific_time.tm_mon:02d}{pacific_time.tm_mday:02d}" \
-               f"_{pacific_time.tm_hour:02d}{pacific_time.tm_min:02d}{pacific_time.tm_sec:02d}"
+        return self._format_timestamp(self.get_pacific_time())
+        
+    def _format_timestamp(self, pacific_time):
+        """Format a Pacific datetime as YYYYMMDD_HHMMSS"""
+        # Date and hour/minute prefixes only change occasionally, so
+        # reformat them on change and just append the seconds
+        date_key = pacific_time.tm_year * 10000 + pacific_time.tm_mon * 100 + pacific_time.tm_mday
+        if date_key != self._ts_date_key:
+            self._ts_date_key = date_key
+            self._ts_date_str = f"{date_key:08d}_"
+            self._ts_hm_key = -1
+        hm_key = pacific_time.tm_hour * 100 + pacific_time.tm_min
+        if hm_key != self._ts_hm_key:
+            self._ts_hm_key = hm_key
+            self._ts_prefix = f"{self._ts_date_str}{hm_key:04d}"
+        return f"{self._ts_prefix}{pacific_time.tm_sec:02d}"
                
     def set_rtc_time(self, year, month, day, hour, minute, second):
         """Set DS3231 RTC time (use for initial setup)"""
         new_time = time.struct_time((year, month, day, hour, minute, second, 0, 0, 0))
         self.ds3231.datetime = new_time
+        self.invalidate_time_cache()
         self.sync_system_rtc()
-        print(f"RTC time set to: {self.format_datetime(new_time)}")
+        print("RTC time set to:", self.format_datetime(new_time))
         
-    def get_system_info(self):
-        """Get system time information for diagnostics"""
-        utc_time = self.get_utc_time()
-        pacific_time = self.get_pacific_time()
+    def snapshot(self, tolerance_minutes=TRANSMISSION_TOLERANCE_MINUTES):
+        """
+        Read the DS3231 once and derive everything a wake cycle needs
+        Returns the get_system_info() fields plus the raw datetimes,
+        tz offset and logging timestamp
+        """
+        utc_time, pacific_time = self._read_times()
         is_dst = self.is_daylight_saving_time(utc_time)
-        is_tx_time, next_tx = self.is_transmission_time()
-        minutes_until = self.minutes_until_next_transmission()
+        current_total_minutes = pacific_time.tm_hour * 60 + pacific_time.tm_min
+        is_tx_time, next_tx = self._transmission_slot(current_total_minutes, tolerance_minutes)
         
         return {
+            "utc": utc_time,
+            "pacific": pacific_time,
+            "tz_offset_seconds": self._get_tz_offset_seconds(utc_time),
+            "timestamp": self._format_timestamp(pacific_time),
             "utc_time": self.format_datetime(utc_time, False),
             "pacific_time": self.format_datetime(pacific_time),
             "is_daylight_saving": is_dst,
             "timezone": "PDT" if is_dst else "PST",
             "is_transmission_time": is_tx_time,
             "next_transmission": next_tx,
-            "minutes_until_next": minutes_until
-        }
\ No newline at end of file
+            "minutes_until_next": self._minutes_until_next(current_total_minutes)
+        }
+        
+    def get_system_info(self):
+        """Get system time information for diagnostics (single RTC read)"""
+        return self.snapshot()
+        
+    def deinit(self):
+        """Clean up resources"""
+        if self._owned_i2c:
+            self._owned_i2c.deinit()
+            self._owned_i2c = None
@@ -0,0 +1,40 @@
+"""
+Decode a binary water log (BINARY_LOG = True) into CSV
+Runs on a desktop Python, not on the board
+
+Usage: python decode_binary_log.py water_log.bin > water_log.csv
+
+Records store UTC epoch seconds, so the first column is timestamp_utc
+(YYYYMMDD_HHMMSSZ), unlike the Pacific local timestamp in the CSV log
+"""
+
+import csv
+import struct
+import sys
+from datetime import datetime, timezone
+
+# Must match BIN_LOG_RECORD in circuitpython/config.py
+BIN_LOG_RECORD = "<IfHfBBh32s"
+RECORD_SIZE = struct.calcsize(BIN_LOG_RECORD)
+
+HEADER = ["timestamp_utc", "depth_feet", "pressure_raw", "battery_voltage",
+          "transmission_success", "transmission_attempts", "signal_quality", "error"]
+
+def decode(path, out):
+    """Write one CSV row per record in path; a trailing partial record is ignored"""
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    with open(path, "rb") as f:
+        data = f.read()
+    for record in struct.iter_unpack(BIN_LOG_RECORD, data[:len(data) - len(data) % RECORD_SIZE]):
+        epoch, depth, raw, battery, success, attempts, signal, error = record
+        timestamp = datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y%m%d_%H%M%SZ") if epoch else ""
+        writer.writerow([
+            timestamp, f"{depth:.2f}", raw, f"{battery:.2f}", bool(success),
+            attempts, signal, error.rstrip(b"\0").decode("utf-8", "replace")
+        ])
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__.strip())
+    decode(sys.argv[1], sys.stdout)